@@ -3,14 +3,19 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from portfolio_analyzer.market_data_service import get_prices_df, get_ticker_details
+from portfolio_analyzer.market_data_service import get_prices_df, resolve_tickers
 from portfolio_analyzer.metrics import calculate_return_rates, compute_portfolio_growth
 from portfolio_analyzer.utils import (
     load_value,
+    plotly_chart,
     rename_ticker_columns_to_names,
+    show_profiling_panel,
+    start_profiling,
     store_value,
 )
 
+profiling_started = start_profiling()
+
 "# Portfolio Analyzer"
 "## Disclaimer"
 """This project is a **experimental tool** created for learning and demonstration purposes.
@@ -58,16 +63,15 @@ st.text_input(
     args=["tickers"],
 )
 
-portfolio_items = []
-for i, item in enumerate(st.session_state.tickers.split(";")):
-    try:
-        ticker_data = get_ticker_details(item)
-        portfolio_items.append({"ticker": item, **ticker_data})
-    except Exception as e:
-        st.error(e)
-        st.stop()
+tickers_details, ticker_errors = resolve_tickers(st.session_state.tickers.split(";"))
+for error in ticker_errors.values():
+    st.error(error)
+if not tickers_details:
+    st.stop()
 
-portfolio_df = pd.DataFrame.from_dict(portfolio_items)
+portfolio_df = pd.DataFrame.from_dict(
+    [{"ticker": ticker, **details} for ticker, details in tickers_details.items()]
+)
 columns = st.columns(2)
 
 for item in portfolio_df.itertuples():
@@ -88,6 +92,9 @@ portfolio_df["allocation"] = portfolio_df["ticker"].map(
     lambda ticker: st.session_state[f"allocation_{ticker}"]
 )
 
+if ticker_errors:
+    st.stop()
+
 if portfolio_df["allocation"].sum() != 100:
     st.error(
         f"Sum of allocation accross all assets must be 100, current sum is: {portfolio_df['allocation'].sum()}"
@@ -105,4 +112,6 @@ st.session_state["portfolio_df"] = portfolio_df
 fig = px.pie(portfolio_df, values="allocation", names="name", hole=0.3)
 fig.update_traces(textinfo="label+percent")
 fig.update_layout(showlegend=False)
-st.plotly_chart(fig)
+plotly_chart(fig)
+
+show_profiling_panel(profiling_started)
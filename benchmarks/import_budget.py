@@ -0,0 +1,71 @@
+"""Checks that the core modules import without the UI and provider
+dependencies, within a time and memory budget.
+
+Every module is imported in a fresh interpreter, run with
+`python benchmarks/import_budget.py`. Exits with status 1 when a module is
+over budget.
+"""
+
+import json
+import pkgutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# Only needed by the Streamlit pages or a provider, loaded on use in the core
+HEAVY_MODULES = ("streamlit", "yfinance", "plotly", "scipy")
+# Streamlit helpers of the pages, the only module allowed to import it
+UI_MODULES = {"portfolio_analyzer.utils"}
+MAX_IMPORT_SECONDS = 1.0
+MAX_RSS_MB = 200
+
+_MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": sorted({{name.split(".")[0] for name in sys.modules}} & {heavy}),
+}}))
+"""
+
+
+def core_modules() -> list[str]:
+    modules = pkgutil.iter_modules([str(ROOT / "portfolio_analyzer")])
+    names = [f"portfolio_analyzer.{module.name}" for module in modules]
+    return sorted(name for name in names if name not in UI_MODULES)
+
+
+def measure(module: str) -> dict:
+    code = _MEASURE.format(module=module, heavy=set(HEAVY_MODULES))
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> int:
+    failures = 0
+    for module in core_modules():
+        result = measure(module)
+        problems = []
+        if result["heavy"]:
+            problems.append(f"imports {', '.join(result['heavy'])}")
+        if result["seconds"] > MAX_IMPORT_SECONDS:
+            problems.append(f"over {MAX_IMPORT_SECONDS} s")
+        if result["rss_mb"] > MAX_RSS_MB:
+            problems.append(f"over {MAX_RSS_MB} MB")
+
+        failures += bool(problems)
+        print(
+            f"{module:45} {result['seconds']:6.3f} s {result['rss_mb']:6.0f} MB"
+            f"  {'; '.join(problems) or 'ok'}"
+        )
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
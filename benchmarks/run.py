@@ -0,0 +1,399 @@
+"""Benchmarks of the core computations on synthetic data, e.g.
+
+    python benchmarks/run.py --profile quick
+    python benchmarks/run.py --profile full --compare last
+
+Every benchmark runs over a grid of sizes (assets, years of daily data or
+simulated paths) and records its wall time and the peak memory traced while
+it runs. Runs are appended to a JSON lines history, and `--compare` checks a
+run against an earlier one of the same profile, exiting with status 1 when
+something got slower or bigger than the tolerance.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from portfolio_analyzer.backtest import RebalancingPolicy, run_backtest
+from portfolio_analyzer.drawdown import summarize_drawdowns
+from portfolio_analyzer.metrics import (
+    bin_series,
+    compute_drawdown_df,
+    compute_portfolio_growth,
+    evaluate_portfolios,
+)
+from portfolio_analyzer.optimizer import PortfolioOptimizer
+from portfolio_analyzer.price_panel import build_price_panel
+from portfolio_analyzer.returns_cube import build_returns_cube
+from portfolio_analyzer.risk import compute_risk
+from portfolio_analyzer.rolling import (
+    rolling_drawdown,
+    rolling_sharpe_ratio,
+    rolling_volatility,
+)
+from portfolio_analyzer.simulation import (
+    estimate_return_model,
+    simulate_allocations,
+    simulate_portfolio,
+)
+
+HISTORY_PATH = ROOT / "benchmarks" / "history.jsonl"
+# Sizes of every benchmark axis, universes are the assets of the optimizer
+PROFILES = {
+    "quick": {
+        "assets": (1, 20),
+        "years": (1, 10),
+        "paths": (10_000,),
+        "universe": (100,),
+    },
+    "full": {
+        "assets": (1, 100, 2_000),
+        "years": (1, 10, 50),
+        "paths": (10_000, 100_000, 1_000_000),
+        "universe": (100, 500),
+    },
+}
+# Timed repeats stop after this long, or after `MAX_REPEATS`
+REPEAT_SECONDS = 1.0
+MAX_REPEATS = 5
+# Portfolios evaluated at once by the multi-allocation benchmarks
+NUM_ALLOCATIONS = 100
+# Assets of the correlated Monte Carlo, its cost grows with assets x paths
+SIMULATION_ASSETS = 10
+FORECAST_DAYS = 252
+SEED = 0
+
+BENCHMARKS = {}
+
+
+def benchmark(*axes: str):
+    """Registers `setup(**sizes)`, which prepares the data and returns the
+    function to time."""
+
+    def decorator(setup):
+        BENCHMARKS[setup.__name__] = (axes, setup)
+        return setup
+
+    return decorator
+
+
+def synthetic_closes(num_assets: int, years: int) -> dict[str, pd.Series]:
+    """Geometric Brownian motion closes over business days, with staggered
+    inception dates and a few missing sessions per asset so that aligning
+    them does real work."""
+    rng = np.random.default_rng(SEED)
+    sessions = pd.bdate_range(end="2025-12-31", periods=years * 252, name="date")
+    n = len(sessions)
+
+    log_returns = rng.normal(0.0003, 0.012, size=(n, num_assets))
+    # Scaled so that every asset closes the last session at 100
+    closes = 100 * np.exp(np.cumsum(log_returns, axis=0) - log_returns.sum(axis=0))
+    inceptions = rng.integers(0, n // 10 + 1, size=num_assets)
+    missing = np.arange(n)[:, None] < inceptions
+    missing |= rng.random((n, num_assets)) < 0.02
+    # Every asset trades on the last session, as live listings do
+    missing[-1] = False
+    closes[missing] = np.nan
+
+    return {
+        f"A{asset:04d}": pd.Series(closes[:, asset], index=sessions).dropna()
+        for asset in range(num_assets)
+    }
+
+
+def synthetic_panel(num_assets: int, years: int):
+    return build_price_panel(synthetic_closes(num_assets, years))
+
+
+def random_weights(num_portfolios: int, num_assets: int) -> np.ndarray:
+    weights = np.random.default_rng(SEED).random((num_portfolios, num_assets))
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def portfolio_growth(years: int) -> pd.Series:
+    panel = synthetic_panel(5, years)
+    portfolio_df = pd.DataFrame({"ticker": panel.tickers, "allocation": 20})
+    return compute_portfolio_growth(panel, portfolio_df)["portfolio_growth"]
+
+
+@benchmark("assets", "years")
+def price_panel_alignment(assets, years):
+    closes = synthetic_closes(assets, years)
+    return lambda: build_price_panel(closes).to_frame()
+
+
+@benchmark("assets", "years")
+def portfolio_growth_frame(assets, years):
+    panel = synthetic_panel(assets, years)
+    portfolio_df = pd.DataFrame(
+        {"ticker": panel.tickers, "allocation": random_weights(1, assets)[0] * 100}
+    )
+    return lambda: compute_portfolio_growth(panel, portfolio_df)
+
+
+@benchmark("assets", "years")
+def portfolio_evaluation(assets, years):
+    panel = synthetic_panel(assets, years)
+    weights = random_weights(NUM_ALLOCATIONS, assets)
+    return lambda: evaluate_portfolios(panel, weights)
+
+
+@benchmark("assets", "years")
+def returns_cube(assets, years):
+    panel = synthetic_panel(assets, years)
+    allocation = random_weights(1, assets)[0]
+    return lambda: build_returns_cube(panel, allocation)
+
+
+@benchmark("assets", "years")
+def monthly_rebalancing(assets, years):
+    panel = synthetic_panel(assets, years)
+    weights = random_weights(NUM_ALLOCATIONS, assets)
+    policies = [RebalancingPolicy(), RebalancingPolicy("monthly", 0.05, 0.001)]
+    return lambda: run_backtest(panel, weights, policies)
+
+
+@benchmark("years")
+def return_bins(years):
+    returns = portfolio_growth(years).pct_change().dropna() * 100
+    return lambda: bin_series(returns, 1, "%")
+
+
+@benchmark("years")
+def monthly_drawdowns(years):
+    growth = portfolio_growth(years)
+    return lambda: compute_drawdown_df(growth)
+
+
+@benchmark("years")
+def drawdown_summary(years):
+    panel = synthetic_panel(5, years)
+    growth = evaluate_portfolios(panel, random_weights(NUM_ALLOCATIONS, 5)).growth
+    return lambda: summarize_drawdowns(growth)
+
+
+@benchmark("years")
+def rolling_metrics(years):
+    growth = portfolio_growth(years)
+    returns = growth.pct_change().dropna()
+    risk_free_rates = pd.Series(0.0001, index=returns.index)
+    window = min(252, len(returns))
+
+    def run():
+        rolling_volatility(returns, window)
+        rolling_sharpe_ratio(returns, risk_free_rates, window)
+        rolling_drawdown(growth, window)
+
+    return run
+
+
+@benchmark("years")
+def value_at_risk(years):
+    returns = portfolio_growth(years).pct_change().dropna()
+    return lambda: compute_risk(returns, horizons=(1, 10), seed=SEED)
+
+
+@benchmark("paths")
+def portfolio_forecast(paths):
+    return lambda: simulate_portfolio(
+        0.0003, 0.01, FORECAST_DAYS, num_simulations=paths, seed=SEED
+    )
+
+
+@benchmark("paths")
+def correlated_forecast(paths):
+    model = estimate_return_model(synthetic_panel(SIMULATION_ASSETS, 10))
+    weights = random_weights(3, SIMULATION_ASSETS)
+    return lambda: simulate_allocations(
+        model, weights, FORECAST_DAYS, num_simulations=paths, seed=SEED
+    )
+
+
+@benchmark("universe")
+def portfolio_optimization(universe):
+    model = estimate_return_model(synthetic_panel(universe, 10))
+
+    def run():
+        # As the optimizer page, which caches the three per maximum allocation
+        optimizer = PortfolioOptimizer(model, risk_free_rate=2.0)
+        optimizer.minimum_variance()
+        optimizer.maximum_sharpe()
+        optimizer.efficient_frontier()
+
+    return run
+
+
+def measure(func) -> dict:
+    """Wall times of repeated runs, then the peak memory of one more run
+    under tracemalloc (which slows it down, so it is not timed)."""
+    times = []
+    started = time.perf_counter()
+    while len(times) < MAX_REPEATS and (
+        not times or time.perf_counter() - started < REPEAT_SECONDS
+    ):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "min_seconds": min(times),
+        "median_seconds": statistics.median(times),
+        "repeats": len(times),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def run_benchmarks(profile: str, name_filter: str | None) -> list[dict]:
+    results = []
+    for name, (axes, setup) in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+
+        for values in itertools.product(*(PROFILES[profile][axis] for axis in axes)):
+            sizes = dict(zip(axes, values))
+            result = {"benchmark": name, "sizes": sizes, **measure(setup(**sizes))}
+            results.append(result)
+            print(
+                f"{name:24} {_format_sizes(sizes):30} "
+                f"{result['min_seconds'] * 1000:10.2f} ms {result['peak_mb']:9.1f} MB",
+                flush=True,
+            )
+    return results
+
+
+def _format_sizes(sizes: dict) -> str:
+    return " ".join(f"{axis}={value}" for axis, value in sizes.items())
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+
+def find_baseline(history: list[dict], profile: str, ref: str) -> dict | None:
+    """The last run of `profile`, at a commit starting with `ref` unless it is
+    "last"."""
+    for record in reversed(history):
+        if record["profile"] != profile:
+            continue
+        if ref == "last" or (record["commit"] or "").startswith(ref):
+            return record
+    return None
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> int:
+    """Prints the changes against `baseline`, returns the number of
+    regressions. Tiny absolute changes are ignored as noise."""
+    baseline_results = {
+        (result["benchmark"], _format_sizes(result["sizes"])): result
+        for result in baseline["results"]
+    }
+
+    regressions = 0
+    print(f"\nAgainst {baseline['commit']} of {baseline['timestamp']}:")
+    for result in results:
+        key = (result["benchmark"], _format_sizes(result["sizes"]))
+        if key not in baseline_results:
+            continue
+
+        before = baseline_results[key]
+        time_ratio = result["min_seconds"] / before["min_seconds"]
+        memory_ratio = (result["peak_mb"] + 1) / (before["peak_mb"] + 1)
+        slower = time_ratio > 1 + tolerance and (
+            result["min_seconds"] - before["min_seconds"] > 1e-3
+        )
+        bigger = memory_ratio > 1 + tolerance
+
+        regressions += slower or bigger
+        status = "REGRESSION" if slower or bigger else "ok"
+        print(
+            f"{key[0]:24} {key[1]:30} time x{time_ratio:5.2f} "
+            f"memory x{memory_ratio:5.2f}  {status}"
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=PROFILES, default="quick")
+    parser.add_argument("--filter", help="Only benchmarks whose name contains it")
+    parser.add_argument(
+        "--compare", metavar="REF", help='"last" or a commit of an earlier run'
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed relative increase"
+    )
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    parser.add_argument(
+        "--no-save", action="store_true", help="Don't add the run to the history"
+    )
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    baseline = None
+    if args.compare:
+        baseline = find_baseline(history, args.profile, args.compare)
+        # Nothing to compare the first run with, it becomes the baseline
+        if baseline is None and args.compare != "last":
+            print(f"No {args.profile} run matching '{args.compare}' in {args.history}")
+            return 1
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "profile": args.profile,
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": run_benchmarks(args.profile, args.filter),
+    }
+
+    if not args.no_save:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with args.history.open("a") as history_file:
+            history_file.write(json.dumps(record) + "\n")
+
+    if baseline is not None and compare(record["results"], baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
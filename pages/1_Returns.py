@@ -1,24 +1,35 @@
+from datetime import datetime
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from portfolio_analyzer.analysis_service import (
+    get_rebalancing_backtest,
+    get_rolling_returns,
+)
+from portfolio_analyzer.backtest import REBALANCING_FREQUENCIES, RebalancingPolicy
 from portfolio_analyzer.interest_data_service import load_risk_free_rates
-from portfolio_analyzer.market_data_service import get_prices_df
+from portfolio_analyzer.market_data_service import get_returns_cube
 from portfolio_analyzer.metrics import (
     bin_series,
     calculate_arr,
-    calculate_return_rates,
     compute_excess_returns,
-    compute_portfolio_growth,
     compute_sharpe_ratio,
+    label_return_rates,
 )
+from portfolio_analyzer.rolling import ROLLING_WINDOWS
 from portfolio_analyzer.utils import (
     ensure_portfolio_configured,
     fig_layout,
+    plotly_chart,
     rename_ticker_columns_to_names,
+    show_profiling_panel,
+    start_profiling,
 )
 
+profiling_started = start_profiling()
 ensure_portfolio_configured()
 portfolio_df = st.session_state.portfolio_df
 
@@ -35,13 +46,9 @@ To ensure a fair comparison, this chart tracks a hypothetical 10,000 € investm
 in each individual asset, starting simultaneously from the inception date of the newest fund.
 """
 
-prices_df = get_prices_df(portfolio_df["ticker"].tolist())
+returns_cube = get_returns_cube(portfolio_df)
 
-monthly_prices_df = prices_df.resample("ME").last()
-
-portfolio_growth_df = compute_portfolio_growth(
-    monthly_prices_df, portfolio_df, normalize_value=10_000
-).round(0)
+portfolio_growth_df = returns_cube.monthly_growth_df.mul(10_000).round(0)
 
 "### Comparative Asset Performance"
 """Each asset receives 10.000 €, invested at the same time,
@@ -56,7 +63,7 @@ fig = px.line(
 )
 fig.update_layout(**fig_layout)
 
-st.plotly_chart(fig)
+plotly_chart(fig)
 
 "### Portfolio Performance"
 """
@@ -72,7 +79,61 @@ fig = px.line(
 )
 fig.update_layout(**fig_layout, showlegend=False)
 
-st.plotly_chart(fig)
+plotly_chart(fig)
+
+"### Rebalancing"
+"""
+The chart above assumes you invest once and let the allocation drift with the markets.
+Rebalancing periodically sells what grew and buys what lagged to restore your allocation,
+which keeps the risk of the portfolio in line with your plan but costs fees on every trade.
+Compare the growth of the same allocation under different rebalancing rules:
+"""
+transaction_cost = st.number_input(
+    "Transaction cost (% of the traded value)",
+    min_value=0.0,
+    max_value=5.0,
+    value=0.1,
+    step=0.05,
+)
+rebalancing_policies = [
+    RebalancingPolicy(),
+    *(
+        RebalancingPolicy(frequency, transaction_cost=transaction_cost / 100)
+        for frequency in REBALANCING_FREQUENCIES
+    ),
+    RebalancingPolicy(threshold=0.05, transaction_cost=transaction_cost / 100),
+]
+backtest, rebalancing_metrics = get_rebalancing_backtest(
+    portfolio_df, rebalancing_policies
+)
+
+fig = px.line(
+    backtest.growth_df().mul(10_000).resample("ME").last(),
+    labels={"value": "Portfolio Value", "date": "Date", "variable": "Rebalancing"},
+)
+fig.update_layout(**fig_layout)
+plotly_chart(fig)
+
+st.dataframe(
+    pd.DataFrame(
+        {
+            "Annualized Return Rate": rebalancing_metrics.arr,
+            "Volatility": rebalancing_metrics.volatility,
+            "Sharpe Ratio": rebalancing_metrics.sharpe_ratio,
+            "Maximum Drawdown": rebalancing_metrics.max_drawdown,
+            "Rebalancings": backtest.num_rebalancings[:, 0],
+            "Costs (€)": backtest.costs[:, 0] * 10_000,
+        },
+        index=[policy.label for policy in rebalancing_policies],
+    ),
+    column_config={
+        "Annualized Return Rate": st.column_config.NumberColumn(format="%.2f %%"),
+        "Volatility": st.column_config.NumberColumn(format="%.2f %%"),
+        "Sharpe Ratio": st.column_config.NumberColumn(format="%.2f"),
+        "Maximum Drawdown": st.column_config.NumberColumn(format="%.2f %%"),
+        "Costs (€)": st.column_config.NumberColumn(format="%.0f"),
+    },
+)
 
 "## Annual Returns"
 """
@@ -80,11 +141,11 @@ Review your year-over-year performance.
 This section tracks the annual percentage change in your portfolio's total value,
 helping you identify long-term trends and volatility.
 """
-annual_returns_df = calculate_return_rates(
-    portfolio_performance_df.resample("YE").last()["portfolio_growth"]
+annual_returns_df = label_return_rates(
+    returns_cube.annual_returns_df["portfolio_return"]
 )
-monthly_returns_df = calculate_return_rates(
-    portfolio_performance_df.resample("ME").last()["portfolio_growth"]
+monthly_returns_df = label_return_rates(
+    returns_cube.monthly_returns_df["portfolio_return"]
 )
 annualized_return = calculate_arr(annual_returns_df["return"])
 
@@ -100,7 +161,7 @@ fig = px.bar(
     labels={"return": "Annual Return Rate (%)", "x": "Year"},
 )
 fig.update_layout(showlegend=False)
-st.plotly_chart(fig)
+plotly_chart(fig)
 
 
 "### Annual Returns Count"
@@ -122,7 +183,7 @@ fig = px.bar(
     labels={"count": "Number of Years", "label": "Annual Return Range (%)"},
 )
 fig.update_layout(showlegend=False)
-st.plotly_chart(fig)
+plotly_chart(fig)
 
 "## Excess Return Rate vs Risk-Free Rate"
 """
@@ -165,7 +226,7 @@ fig = px.line(
     },
 )
 fig.update_layout(**fig_layout)
-st.plotly_chart(fig)
+plotly_chart(fig)
 
 
 sharpe_ratio = compute_sharpe_ratio(monthly_excess_df)
@@ -229,7 +290,43 @@ fig.add_annotation(
 fig.update_yaxes(visible=False)
 fig.update_layout(height=350)
 
-st.plotly_chart(fig)
+plotly_chart(fig)
+
+"### Rolling Performance"
+"""
+A single number over the whole history hides how performance changed over time.
+These charts recompute the annualized return rate and the Sharpe Ratio
+over a window that slides one trading day at a time.
+
+*Note: Unlike the figure above, the rolling Sharpe Ratio uses daily excess returns.*
+"""
+rolling_window = (
+    st.pills(
+        "Rolling window:",
+        list(ROLLING_WINDOWS),
+        default="3 years",
+        key="returns_window",
+    )
+    or "3 years"
+)
+window = ROLLING_WINDOWS[rolling_window]
+
+rolling_df = get_rolling_returns(portfolio_df, window).rename(
+    columns={"arr": "Annualized Return Rate (%)", "sharpe_ratio": "Sharpe Ratio"}
+)
+
+if rolling_df.empty:
+    st.info(f"Your portfolio's common history is shorter than {rolling_window}.")
+else:
+    fig = px.line(
+        rolling_df,
+        facet_row="variable",
+        labels={"date": "Date", "value": "", "variable": ""},
+    )
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    fig.update_yaxes(matches=None)
+    fig.update_layout(**fig_layout, showlegend=False, height=500)
+    plotly_chart(fig)
 
 "## Returns Correlations"
 """
@@ -240,10 +337,10 @@ or move independently (low correlation).
 Mixing assets that don't move in lockstep is the key to smoothing out volatility,
 reducing your overall risk, and building a truly diversified portfolio.
 """
-indv_returns_df = indv_growth_df.copy()
-indv_returns_df = rename_ticker_columns_to_names(indv_returns_df, portfolio_df)
-for col in indv_returns_df.columns:
-    indv_returns_df[col] = calculate_return_rates(indv_returns_df[col])["return"]
+indv_returns_df = returns_cube.monthly_returns_df[portfolio_df["ticker"]]
+indv_returns_df = rename_ticker_columns_to_names(
+    indv_returns_df[indv_returns_df.index.year < datetime.now().year], portfolio_df
+)
 
 corr_df = indv_returns_df.corr()
 
@@ -251,4 +348,6 @@ fig = px.imshow(corr_df, zmin=-1, zmax=1)
 fig.update_xaxes(tickangle=30)
 fig.update_layout(height=500)
 
-st.plotly_chart(fig)
+plotly_chart(fig)
+
+show_profiling_panel(profiling_started)
@@ -1,15 +1,22 @@
 import plotly.express as px
 import streamlit as st
-import pandas as pd
 
-from portfolio_analyzer.market_data_service import get_prices_df
-from portfolio_analyzer.metrics import (
-    compute_drawdown_df,
-    compute_portfolio_growth,
-    compute_value_at_risk,
+from portfolio_analyzer.analysis_service import (
+    get_drawdowns,
+    get_portfolio_risk,
+    get_rolling_risk,
+)
+from portfolio_analyzer.risk import VAR_METHODS
+from portfolio_analyzer.rolling import ROLLING_WINDOWS
+from portfolio_analyzer.utils import (
+    ensure_portfolio_configured,
+    fig_layout,
+    plotly_chart,
+    show_profiling_panel,
+    start_profiling,
 )
-from portfolio_analyzer.utils import ensure_portfolio_configured, fig_layout
 
+profiling_started = start_profiling()
 ensure_portfolio_configured()
 portfolio_df = st.session_state.portfolio_df
 
@@ -34,9 +41,7 @@ with st.expander("How to Interpret This Chart"):
     The 'Maximum Drawdown' is the lowest point on this chart.
     """
 
-prices_df = get_prices_df(portfolio_df["ticker"].tolist()).dropna(how="any")
-growth_df = compute_portfolio_growth(prices_df, portfolio_df)
-drawdown_df = compute_drawdown_df(growth_df["portfolio_growth"])
+drawdown_df, drawdown_summary, episodes_df = get_drawdowns(portfolio_df)
 
 fig = px.area(
     drawdown_df[["drawdown"]],
@@ -44,93 +49,179 @@ fig = px.area(
     color_discrete_sequence=["red"],
 )
 fig.update_layout(**fig_layout, showlegend=False)
-st.plotly_chart(fig)
+plotly_chart(fig)
 
-"## Maximum Loss (Value at Risk)"
+"### Drawdown Episodes"
 """
-Value at Risk (VaR) represents the maximum expected
-loss over a specified time period at a given confidence level. 
-
-For example, an annual VaR at a 95% confidence level means there is only a 5%
-chance your portfolio will lose more than that amount in a given year.
+Each drawdown episode starts at a peak, bottoms out at a trough and ends when
+the portfolio recovers its previous peak. The table lists your deepest episodes,
+with their durations in trading days.
 """
 
-with st.expander("View Calculation Methodology"):
+with st.expander("About the Ulcer Index and Calmar Ratio"):
     """
-    We calculate VaR using the variance-covariance method, which assumes returns are normally distributed. 
-    The annual VaR is estimated by scaling the monthly VaR.
-    
-    The monthly VaR is computed as:
+    The **Ulcer Index** is the root mean square of the daily drawdowns: it grows with
+    both the depth and the length of the drawdowns, not only the worst one.
+
+    The **Calmar Ratio** divides the annualized return by the maximum drawdown.
+    The higher it is, the more return you earned for the worst loss you went through.
     """
-    st.latex(r"VaR_{monthly} = \mu - z \cdot \sigma")
 
-    """and the annual VaR is estimated as:"""
-    st.latex(r"VaR_{annual} = 12 \cdot \mu - \sqrt{12} \cdot z \cdot \sigma")
+left_col, middle_col, right_col = st.columns(3)
+with left_col:
+    st.metric(
+        "Maximum Drawdown", f"{drawdown_summary['max_drawdown']:.2f} %", border=True
+    )
+with middle_col:
+    st.metric("Ulcer Index", f"{drawdown_summary['ulcer_index']:.2f}", border=True)
+with right_col:
+    st.metric("Calmar Ratio", f"{drawdown_summary['calmar_ratio']:.2f}", border=True)
+
+st.dataframe(
+    episodes_df.head(5),
+    hide_index=True,
+    column_config={
+        "peak_date": st.column_config.DateColumn("Peak"),
+        "trough_date": st.column_config.DateColumn("Trough"),
+        "recovery_date": st.column_config.DateColumn("Recovery"),
+        "depth": st.column_config.NumberColumn("Depth", format="%.2f %%"),
+        "duration": st.column_config.NumberColumn("Duration"),
+        "time_to_trough": st.column_config.NumberColumn("Peak to Trough"),
+        "time_to_recover": st.column_config.NumberColumn("Trough to Recovery"),
+    },
+)
 
-    r"""
-    where:
-    - $\mu$ is the mean of the monthly returns
-    - $\sigma$ is the standard deviation of the monthly returns
-    - $z$ is the z-score corresponding to the confidence level (e.g., 95% or 99%)
-    """
+"## Maximum Loss (Value at Risk)"
+"""
+Value at Risk (VaR) represents the maximum expected
+loss over a specified time period at a given confidence level. 
 
-monthly_prices_df = prices_df.resample("ME").last()
-monthly_growth_df = compute_portfolio_growth(monthly_prices_df, portfolio_df)
-monthly_growth_df["monthly_return"] = monthly_growth_df["portfolio_growth"].pct_change()
+For example, an annual VaR at a 95% confidence level means there is only a 5%
+chance your portfolio will lose more than that amount in a given year.
 
+Expected Shortfall (also called CVaR) is the average loss in those worst cases,
+it tells how bad things get once the VaR is exceeded.
+"""
 
-var_monthly_95 = compute_value_at_risk(
-    monthly_growth_df["monthly_return"], confidence_level=0.95
+var_method_descriptions = {
+    "Variance-covariance": r"""
+    Assumes monthly returns are normally distributed. The monthly VaR is computed as
+    $VaR_{monthly} = \mu - z \cdot \sigma$ and the annual VaR is estimated by scaling it:
+    $VaR_{annual} = 12 \cdot \mu - \sqrt{12} \cdot z \cdot \sigma$, where $\mu$ and
+    $\sigma$ are the mean and standard deviation of the monthly returns and $z$ is the
+    z-score of the confidence level (e.g., 95% or 99%).
+    """,
+    "Cornish-Fisher": """
+    Starts from the variance-covariance method and corrects the z-score for the
+    skewness and the fat tails (excess kurtosis) of your monthly returns,
+    which a normal distribution underestimates.
+    """,
+    "Historical": """
+    Reads the losses directly from your past returns: the monthly VaR is the 5th
+    (or 1st) percentile of your monthly returns, the annual VaR the same percentile
+    of every 12-month period in the history.
+    """,
+    "Monte Carlo": """
+    Simulates 10.000 months and years by drawing your past monthly returns at random,
+    and reads the percentiles of the simulated returns.
+    """,
+}
+var_methods = dict(zip(var_method_descriptions, VAR_METHODS))
+
+var_method = (
+    st.pills("Method:", list(var_method_descriptions), default="Variance-covariance")
+    or "Variance-covariance"
 )
 
-var_monthly_99 = compute_value_at_risk(
-    monthly_growth_df["monthly_return"], confidence_level=0.99
+with st.expander("View Calculation Methodology"):
+    var_method_descriptions[var_method]
+
+# Both levels and horizons at once, for the selected method only
+risk_df = get_portfolio_risk(
+    portfolio_df,
+    confidence_levels=(0.95, 0.99),
+    horizons=(1, 12),
+    methods=(var_methods[var_method],),
+).to_frame()
+risk_df = risk_df.assign(
+    **{"Confidence Level": lambda df: df["confidence_level"].map("{:.0%}".format)}
 )
-
-var_annual_95 = compute_value_at_risk(
-    monthly_growth_df["monthly_return"], confidence_level=0.95, scale=12
+risk_df = risk_df.melt(
+    id_vars=["horizon", "Confidence Level"],
+    value_vars=["value_at_risk", "expected_shortfall"],
+    var_name="measure",
+    value_name="loss",
 )
-var_annual_99 = compute_value_at_risk(
-    monthly_growth_df["monthly_return"], confidence_level=0.99, scale=12
+risk_df["measure"] = risk_df["measure"].map(
+    {"value_at_risk": "VaR", "expected_shortfall": "Expected Shortfall"}
 )
 
-monthly_var_df = pd.DataFrame(
-    {
-        "Confidence Level": ["95%", "99%"],
-        "Monthly VaR (%)": [var_monthly_95, var_monthly_99],
-    }
+left_col, right_col = st.columns(2)
+
+for col, horizon, title in [
+    (left_col, 1, "Monthly"),
+    (right_col, 12, "Annual"),
+]:
+    with col:
+        f"### {title} Value at Risk"
+        horizon_df = risk_df[risk_df["horizon"] == horizon]
+        if horizon_df["loss"].isna().all():
+            st.info(
+                f"Your portfolio's history is too short for the {title.lower()}"
+                f" {var_method} VaR."
+            )
+            continue
+        fig = px.bar(
+            horizon_df,
+            x="measure",
+            y="loss",
+            color="Confidence Level",
+            barmode="group",
+            color_discrete_map={"95%": "orange", "99%": "red"},
+            labels={"measure": "", "loss": f"{title} Loss (%)"},
+        )
+        fig.update_traces(texttemplate="%{y:.2f}%", textposition="outside")
+        fig.update_layout(**fig_layout)
+        plotly_chart(fig)
+
+"## Rolling Risk"
+"""
+Risk is not constant: calm periods alternate with turbulent ones.
+These charts recompute your portfolio's risk over a window that slides
+one trading day at a time:
+- **Volatility**: annualized standard deviation of the daily returns in the window
+- **Monthly VaR**: Value at Risk over 21 trading days at a 95% confidence level,
+  estimated from the daily returns in the window
+- **Drawdown**: decline from the highest value reached within the window
+"""
+rolling_window = (
+    st.pills(
+        "Rolling window:", list(ROLLING_WINDOWS), default="3 years", key="risks_window"
+    )
+    or "3 years"
 )
-annual_var_df = pd.DataFrame(
-    {
-        "Confidence Level": ["95%", "99%"],
-        "Annual VaR (%)": [var_annual_95, var_annual_99],
+window = ROLLING_WINDOWS[rolling_window]
+
+rolling_df = get_rolling_risk(portfolio_df, window).rename(
+    columns={
+        "volatility": "Volatility (%)",
+        "value_at_risk": "Monthly VaR (%)",
+        "drawdown": "Drawdown (%)",
     }
 )
 
-left_col, right_col = st.columns(2)
-
-with left_col:
-    "### Monthly Value at Risk"
-    fig = px.bar(
-        monthly_var_df,
-        x="Confidence Level",
-        y="Monthly VaR (%)",
-        color="Confidence Level",
-        color_discrete_map={"95%": "orange", "99%": "red"},
+if rolling_df.empty:
+    st.info(f"Your portfolio's common history is shorter than {rolling_window}.")
+else:
+    fig = px.line(
+        rolling_df,
+        facet_row="variable",
+        labels={"date": "Date", "value": "", "variable": ""},
+        color_discrete_sequence=["red"],
     )
-    fig.update_traces(texttemplate="%{y:.2f}%", textposition="outside")
-    fig.update_layout(showlegend=False)
-    st.plotly_chart(fig)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    fig.update_yaxes(matches=None)
+    fig.update_layout(**fig_layout, showlegend=False, height=650)
+    plotly_chart(fig)
 
-with right_col:
-    "### Annual Value at Risk"
-    fig = px.bar(
-        annual_var_df,
-        x="Confidence Level",
-        y="Annual VaR (%)",
-        color="Confidence Level",
-        color_discrete_map={"95%": "orange", "99%": "red"},
-    )
-    fig.update_traces(texttemplate="%{y:.2f}%", textposition="outside")
-    fig.update_layout(showlegend=False)
-    st.plotly_chart(fig)
+show_profiling_panel(profiling_started)
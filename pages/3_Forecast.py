@@ -1,20 +1,28 @@
-import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
-from scipy.stats import norm
 
-from portfolio_analyzer.market_data_service import get_prices_df
-from portfolio_analyzer.metrics import (
-    bin_series,
-    compute_portfolio_growth,
+from portfolio_analyzer.forecast_service import (
+    FORECAST_RETURN_MODELS,
+    FORECAST_STEP_DAYS,
+    MAX_FORECAST_DAYS,
+    MIN_FORECAST_DAYS,
+    get_daily_returns,
+    get_forecast,
+    get_return_distribution,
 )
+from portfolio_analyzer.metrics import bin_series
 from portfolio_analyzer.utils import (
     ensure_portfolio_configured,
     fig_layout,
     format_number_with_thousands_separator,
+    plotly_chart,
+    show_profiling_panel,
+    start_profiling,
 )
 
+profiling_started = start_profiling()
 ensure_portfolio_configured()
 portfolio_df = st.session_state.portfolio_df
 
@@ -34,13 +42,10 @@ This chart visualizes the distribution of your historical daily returns,
 overlaid with the fitted normal curve that powers the forecast.
 """
 
-prices_df = get_prices_df(portfolio_df["ticker"].tolist())
-portfolio_growth_df = compute_portfolio_growth(prices_df, portfolio_df)
+daily_returns = get_daily_returns(portfolio_df)
 
-daily_returns_df = portfolio_growth_df.pct_change().dropna(how="any")
-
-mean = daily_returns_df["portfolio_growth"].mean()
-std = daily_returns_df["portfolio_growth"].std()
+mean = daily_returns.mean()
+std = daily_returns.std()
 
 left_col, right_col = st.columns(2)
 with left_col:
@@ -48,99 +53,113 @@ with left_col:
 with right_col:
     st.metric("Standard deviation of daily returns", f"{std:.4%}", border=True)
 
-bin_region = daily_returns_df["portfolio_growth"].quantile(0.999) * 100
-
-daily_bins_df = (
-    pd.cut(
-        daily_returns_df["portfolio_growth"] * 100,
-        # bins=50,
-        bins=np.arange(-bin_region, bin_region, 0.1),
-    )
-    .value_counts()
-    .sort_index()
-    .to_frame(name="count")
-    .reset_index(names="bin")
-)
-
-
-normal_dist_df = pd.DataFrame(
-    {"value": norm.rvs(loc=mean * 100, scale=std * 100, size=10_000)}
-)
-
-
-normal_dist_bins = (
-    pd.cut(normal_dist_df["value"], bins=daily_bins_df["bin"].cat.categories)
-    .value_counts()
-    .sort_index()
-    .to_frame(name="count")
-    .reset_index(names="bin")
-)
-
+return_distribution_df = get_return_distribution(portfolio_df)
 
 fig = px.bar(
-    x=daily_bins_df["bin"].apply(lambda x: x.mid),
-    y=daily_bins_df["count"] / daily_bins_df["count"].sum(),
-    labels={"x": "Daily Return", "y": "Frequency"},
+    return_distribution_df,
+    x="return",
+    y="frequency",
+    labels={"return": "Daily Return", "frequency": "Frequency"},
     color_discrete_sequence=["orange"],
 )
 fig.update_traces(name="Historical Returns", showlegend=True)
 fig.add_scatter(
-    x=normal_dist_bins["bin"].apply(lambda x: x.mid),
-    y=normal_dist_bins["count"] / normal_dist_bins["count"].sum(),
+    x=return_distribution_df["return"],
+    y=return_distribution_df["normal_frequency"],
     mode="markers",
     line={"color": "black", "shape": "spline", "smoothing": 1.3},
     name="Fitted Normal Distribution",
 )
 fig.update_layout(**fig_layout, showlegend=True)
-st.plotly_chart(fig)
+plotly_chart(fig)
 
 
 "## Monte Carlo Simulation"
 
+return_model_descriptions = {
+    "Portfolio": """These paths are generated using a normal distribution based on the historical mean and
+    standard deviation of your portfolio's daily returns
+    (visualized in the "Daily Returns Distribution" chart at the top of the page).""",
+    "Correlated assets": """These paths are generated by drawing correlated daily returns for each asset
+    from a multivariate normal distribution fitted to their historical returns,
+    and combining them with your allocation (rebalanced daily).""",
+    "Historical bootstrap": """These paths replay randomly picked historical trading days of your assets,
+    each day drawn independently, combined with your allocation (rebalanced daily).
+    Unlike the normal models, they keep the fat tails of the historical returns.""",
+    "Block bootstrap": """These paths replay randomly picked stretches of consecutive historical trading
+    days of your assets (about a month long on average), combined with your allocation
+    (rebalanced daily). Besides the fat tails, they keep the clustering of volatile periods.""",
+}
+return_model = (
+    st.pills("Return model:", list(return_model_descriptions), default="Portfolio")
+    or "Portfolio"
+)
+
 days = st.session_state["days_slider"] if "days_slider" in st.session_state else 180
 num_simulations = 10_000
 start_value = 10_000
 
-start_values = np.repeat(start_value, num_simulations).reshape(-1, 1)
-
-returns = norm.rvs(loc=mean, scale=std, size=(num_simulations, days))
-
-forecast = start_values * (1 + returns).cumprod(axis=1)
-forecast = np.hstack([start_values, forecast])
+# Simulated once over the longest horizon, moving the slider only slices it
+forecast = get_forecast(
+    portfolio_df,
+    num_simulations=num_simulations,
+    start_value=start_value,
+    return_model=FORECAST_RETURN_MODELS[return_model],
+).at_horizon(days)
 
 """Adjust the slider below to project your portfolio's growth over a specific timeframe.
 The chart displays a sample of the potential future paths your portfolio could take."""
 st.slider(
     "Days to Forecast",
-    min_value=30,
-    max_value=360,
+    min_value=MIN_FORECAST_DAYS,
+    max_value=MAX_FORECAST_DAYS,
     value=days,
     key="days_slider",
-    step=10,
+    step=FORECAST_STEP_DAYS,
 )
 
 with st.expander("How this forecast works"):
     f"""
     We ran {format_number_with_thousands_separator(num_simulations)} simulated future paths for your portfolio over the next {days} days. 
     
-    These paths are generated using a normal distribution based on the historical mean and
-    standard deviation of your portfolio's daily returns
-    (visualized in the "Daily Returns Distribution" chart at the top of the page).
+    {return_model_descriptions[return_model]}
     
     For visual clarity, only a random sample of 20 simulated paths is displayed on the chart above.
     """
 
 fig = px.line(
-    forecast[:20, :].T,
+    forecast.sample_paths.T,
     labels={"index": "Days", "value": "Simulated Portfolio Value"},
 )
 fig.update_layout(**{**fig_layout, "showlegend": False, "hovermode": False})
-st.plotly_chart(fig)
+plotly_chart(fig)
 
-final_day_forecast = pd.DataFrame({"value": forecast[:, -1]})
-final_day_forecast["sign"] = final_day_forecast["value"].apply(
-    lambda x: "positive" if x >= 10_000 else "negative"
-)
+"### Percentile Bands"
+"""
+The fan chart summarizes all simulated paths at once. The darker band holds the middle
+50% of the outcomes (25th to 75th percentile) for each day, the lighter band the middle
+90% (5th to 95th percentile), and the line follows the median outcome.
+"""
+bands_df = forecast.bands_df
+fig = go.Figure()
+for lower, upper, color in [
+    ("p5", "p95", "rgba(0, 128, 0, 0.2)"),
+    ("p25", "p75", "rgba(0, 128, 0, 0.4)"),
+]:
+    fig.add_scatter(x=bands_df.index, y=bands_df[upper], line_width=0, showlegend=False)
+    fig.add_scatter(
+        x=bands_df.index,
+        y=bands_df[lower],
+        fill="tonexty",
+        fillcolor=color,
+        line_width=0,
+        name=f"{lower[1:]}th to {upper[1:]}th percentile",
+    )
+fig.add_scatter(x=bands_df.index, y=bands_df["p50"], line_color="green", name="Median")
+fig.update_layout(**fig_layout)
+fig.update_xaxes(title="Days")
+fig.update_yaxes(title="Simulated Portfolio Value")
+plotly_chart(fig)
 
 "## Forecasted Portfolio Value Distribution"
 f"""
@@ -150,22 +169,32 @@ simulated portfolio values at the end of your {days}-day forecast period.
 
 It helps visualize the probability of different best-case and worst-case scenarios.
 """
-left_col, right_col = st.columns(2)
+left_col, middle_col, right_col = st.columns(3)
 with left_col:
     st.metric(
         "Expected Value Mean",
-        f"{format_number_with_thousands_separator(final_day_forecast['value'].mean())}",
+        f"{format_number_with_thousands_separator(forecast.terminal_mean)}",
         border=True,
     )
-with right_col:
+with middle_col:
     st.metric(
         "Expected Value Standard Deviation",
-        f"{format_number_with_thousands_separator(final_day_forecast['value'].std())}",
+        f"{format_number_with_thousands_separator(forecast.terminal_std)}",
+        border=True,
+    )
+with right_col:
+    st.metric(
+        "Probability of Loss",
+        f"{forecast.terminal_probability_of_loss:.1%}",
         border=True,
     )
 
+final_values, final_counts = forecast.value_histogram()
 final_bins = bin_series(
-    final_day_forecast["value"], bin_by=1_000, sign_threshold=start_value
+    pd.Series(final_values),
+    bin_by=1_000,
+    sign_threshold=start_value,
+    weights=final_counts,
 )
 
 fig = px.bar(
@@ -181,4 +210,6 @@ fig = px.bar(
 )
 
 fig.update_layout(**{**fig_layout, "showlegend": False, "bargap": 0.2})
-st.plotly_chart(fig)
+plotly_chart(fig)
+
+show_profiling_panel(profiling_started)
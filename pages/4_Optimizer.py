@@ -0,0 +1,135 @@
+import math
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from portfolio_analyzer.optimization_service import (
+    evaluate_portfolio,
+    get_average_risk_free_rate,
+    get_optimized_portfolios,
+)
+from portfolio_analyzer.utils import (
+    ensure_portfolio_configured,
+    fig_layout,
+    plotly_chart,
+    show_profiling_panel,
+    start_profiling,
+)
+
+profiling_started = start_profiling()
+ensure_portfolio_configured()
+portfolio_df = st.session_state.portfolio_df
+tickers = portfolio_df["ticker"].tolist()
+
+"# Portfolio Optimization"
+"""
+This page searches for the allocations of your assets that offer the best trade-off
+between expected return and volatility, based on their historical daily returns,
+and compares them with your current allocation.
+"""
+
+if len(tickers) < 2:
+    st.info("Add at least two assets to your portfolio to optimize its allocation.")
+    st.stop()
+
+"## Efficient Frontier"
+"""
+Each point of the efficient frontier is the allocation with the lowest volatility for
+its expected return. Allocations below the frontier take more risk than needed for
+the same return.
+"""
+
+with st.expander("How to Interpret This Chart"):
+    """
+    The **Minimum Variance** portfolio is the least volatile allocation of your assets.
+    The **Maximum Sharpe Ratio** portfolio earns the highest excess return over the
+    risk-free rate (the average Euribor 3M rate) per unit of volatility.
+
+    Expected returns and volatilities are annualized from the historical daily returns
+    over the period where all assets have prices. Past returns are a poor predictor
+    of future ones, treat the optimized allocations as a starting point.
+    """
+
+min_allocation = math.ceil(100 / len(tickers))
+max_allocation = st.slider(
+    "Maximum allocation per asset (%)",
+    min_value=min_allocation,
+    max_value=100,
+    value=100,
+    step=1,
+)
+
+minimum_variance, maximum_sharpe, frontier_df = get_optimized_portfolios(
+    tickers, max_allocation
+)
+current = evaluate_portfolio(portfolio_df)
+risk_free_rate = get_average_risk_free_rate(tickers)
+
+portfolios = {
+    "Current": current,
+    "Minimum Variance": minimum_variance,
+    "Maximum Sharpe Ratio": maximum_sharpe,
+}
+
+fig = px.line(
+    frontier_df,
+    x="volatility",
+    y="expected_return",
+    hover_data={"sharpe_ratio": ":.2f"},
+    labels={
+        "volatility": "Annual Volatility (%)",
+        "expected_return": "Expected Annual Return (%)",
+        "sharpe_ratio": "Sharpe Ratio",
+    },
+    color_discrete_sequence=["gray"],
+)
+fig.update_traces(name="Efficient Frontier", showlegend=True)
+for (name, portfolio), color in zip(portfolios.items(), ["blue", "green", "orange"]):
+    fig.add_scatter(
+        x=[portfolio.volatility],
+        y=[portfolio.expected_return],
+        mode="markers",
+        marker={"color": color, "size": 12},
+        name=name,
+    )
+fig.update_layout(**{**fig_layout, "hovermode": "closest"})
+plotly_chart(fig)
+
+f"""
+Sharpe ratios of each portfolio, using an annual risk-free rate of {risk_free_rate:.2f}%.
+"""
+columns = st.columns(len(portfolios))
+for col, (name, portfolio) in zip(columns, portfolios.items()):
+    with col:
+        st.metric(
+            f"{name} Portfolio",
+            f"{portfolio.sharpe_ratio:.2f}",
+            f"{portfolio.expected_return:.1f}% return, "
+            f"{portfolio.volatility:.1f}% volatility",
+            delta_color="off",
+            border=True,
+        )
+
+"## Allocations"
+names = portfolio_df.set_index("ticker")["name"]
+allocations_df = pd.DataFrame(
+    {name: portfolio.weights * 100 for name, portfolio in portfolios.items()}
+).rename(index=names)
+allocations_df.index.name = "Asset"
+
+st.dataframe(
+    allocations_df.round(1),
+    column_config={
+        name: st.column_config.NumberColumn(format="%.1f%%") for name in portfolios
+    },
+)
+
+fig = px.bar(
+    allocations_df.T,
+    labels={"index": "", "value": "Allocation (%)", "Asset": "Asset"},
+)
+fig.update_layout(**fig_layout)
+plotly_chart(fig)
+
+show_profiling_panel(profiling_started)
@@ -0,0 +1,74 @@
+"""Headless batch analysis of portfolio files, e.g.
+
+python -m portfolio_analyzer portfolios/ --output results.parquet
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from portfolio_analyzer.batch import (
+    analyze_portfolios,
+    check_output_path,
+    read_portfolios,
+    write_results,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="portfolio_analyzer",
+        description="Computes the returns, risk and forecast of many portfolios.",
+    )
+    parser.add_argument(
+        "portfolios",
+        nargs="+",
+        help="CSV or Parquet files (or directories of them) with ticker and "
+        "allocation (in %%) columns, and optionally a portfolio column",
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="Results file, .parquet or .json"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--confidence-level", type=float, default=0.95)
+    parser.add_argument("--simulations", type=int, default=1_000)
+    parser.add_argument("--horizon", type=int, default=252, help="Forecast days")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    try:
+        # Checked first, not to find out only once everything is computed
+        check_output_path(args.output)
+        portfolios = read_portfolios(args.portfolios)
+        if not portfolios:
+            raise ValueError("No portfolios found.")
+
+        start = time.perf_counter()
+        results_df = analyze_portfolios(
+            portfolios,
+            confidence_level=args.confidence_level,
+            num_simulations=args.simulations,
+            horizon=args.horizon,
+            seed=args.seed,
+            workers=max(1, args.workers),
+        )
+        elapsed = time.perf_counter() - start
+        write_results(results_df, args.output)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    failed_df = results_df[results_df["error"].notna()]
+    for name, error in zip(failed_df["portfolio"], failed_df["error"]):
+        print(f"warning: portfolio '{name}' not analyzed, {error}", file=sys.stderr)
+
+    print(
+        f"Analyzed {len(results_df)} portfolios in {elapsed:.1f} s "
+        f"({len(results_df) / elapsed:.1f} portfolios/s), results in {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
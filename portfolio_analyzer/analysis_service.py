@@ -0,0 +1,192 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.backtest import BacktestResult, RebalancingPolicy, run_backtest
+from portfolio_analyzer.cache import cached
+from portfolio_analyzer.drawdown import compute_drawdown_episodes, summarize_drawdowns
+from portfolio_analyzer.interest_data_service import (
+    get_daily_risk_free_rates,
+    load_risk_free_rates,
+)
+from portfolio_analyzer.market_data_service import (
+    get_price_as_of,
+    get_price_panel,
+    load_returns_cube,
+)
+from portfolio_analyzer.metrics import (
+    PortfolioEvaluation,
+    compute_drawdown_df,
+    evaluate_growth,
+)
+from portfolio_analyzer.risk import RiskReport, compute_risk
+from portfolio_analyzer.rolling import (
+    rolling_arr,
+    rolling_drawdown,
+    rolling_sharpe_ratio,
+    rolling_value_at_risk,
+    rolling_volatility,
+)
+
+
+def _cube_key(
+    portfolio_df: pd.DataFrame,
+) -> tuple[tuple[str, ...], tuple[float, ...], date]:
+    """Tickers, allocation and last price date of a portfolio, the key of its
+    returns cube."""
+    tickers = portfolio_df["ticker"].tolist()
+    return (
+        tuple(tickers),
+        tuple(portfolio_df["allocation"].tolist()),
+        get_price_as_of(tickers),
+    )
+
+
+def get_rebalancing_backtest(
+    portfolio_df: pd.DataFrame, policies: list[RebalancingPolicy]
+) -> tuple[BacktestResult, PortfolioEvaluation]:
+    """Backtest of the portfolio allocation under every policy, and the
+    metrics of each policy's growth."""
+    tickers, allocation, as_of = _cube_key(portfolio_df)
+    monthly_df, _ = load_risk_free_rates()
+
+    return _load_rebalancing_backtest(
+        tickers, allocation, policies, monthly_df["rate"], as_of
+    )
+
+
+# Cached with the key of the returns cube and the inputs of the page, so that
+# a rerun with the same ones and no new prices gets the previous results
+@cached
+def _load_rebalancing_backtest(
+    tickers: tuple[str, ...],
+    allocation: tuple[float, ...],
+    policies: list[RebalancingPolicy],
+    risk_free_rates: pd.Series,
+    as_of: date,
+) -> tuple[BacktestResult, PortfolioEvaluation]:
+    backtest = run_backtest(
+        get_price_panel(list(tickers)),
+        np.array(allocation) / 100,
+        policies,
+    )
+    metrics = evaluate_growth(
+        backtest.dates,
+        backtest.growth[:, :, 0],
+        risk_free_rate_series=risk_free_rates,
+    )
+    return backtest, metrics
+
+
+def get_rolling_returns(portfolio_df: pd.DataFrame, window: int) -> pd.DataFrame:
+    """Annualized return rate and Sharpe ratio of the portfolio over a window
+    of `window` sessions, on the dates with a full window."""
+    tickers, allocation, as_of = _cube_key(portfolio_df)
+    dates = load_returns_cube(tickers, allocation, as_of).daily_returns_df.index
+
+    return _load_rolling_returns(
+        tickers, allocation, window, get_daily_risk_free_rates(dates), as_of
+    )
+
+
+@cached
+def _load_rolling_returns(
+    tickers: tuple[str, ...],
+    allocation: tuple[float, ...],
+    window: int,
+    daily_risk_free_rates: pd.Series,
+    as_of: date,
+) -> pd.DataFrame:
+    returns_cube = load_returns_cube(tickers, allocation, as_of)
+    daily_growth = returns_cube.daily_growth_df["portfolio_growth"]
+    daily_returns = returns_cube.daily_returns_df["portfolio_return"]
+
+    return pd.concat(
+        [
+            rolling_arr(daily_growth, window),
+            rolling_sharpe_ratio(daily_returns, daily_risk_free_rates, window),
+        ],
+        axis=1,
+    ).dropna()
+
+
+def get_drawdowns(
+    portfolio_df: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.Series, pd.DataFrame]:
+    """Returns:
+    - the daily drawdown of the portfolio
+    - its drawdown summary (`summarize_drawdowns`)
+    - its drawdown episodes, deepest first
+    """
+    return _load_drawdowns(*_cube_key(portfolio_df))
+
+
+@cached
+def _load_drawdowns(
+    tickers: tuple[str, ...], allocation: tuple[float, ...], as_of: date
+) -> tuple[pd.DataFrame, pd.Series, pd.DataFrame]:
+    growth_df = load_returns_cube(tickers, allocation, as_of).daily_growth_df
+
+    return (
+        compute_drawdown_df(growth_df["portfolio_growth"]),
+        summarize_drawdowns(growth_df[["portfolio_growth"]]).iloc[0],
+        compute_drawdown_episodes(growth_df["portfolio_growth"]),
+    )
+
+
+def get_portfolio_risk(
+    portfolio_df: pd.DataFrame,
+    confidence_levels: tuple[float, ...],
+    horizons: tuple[int, ...],
+    methods: tuple[str, ...],
+) -> RiskReport:
+    """VaR and Expected Shortfall of the monthly portfolio returns, as
+    `compute_risk`."""
+    tickers, allocation, as_of = _cube_key(portfolio_df)
+    return _load_portfolio_risk(
+        tickers, allocation, confidence_levels, horizons, methods, as_of
+    )
+
+
+@cached
+def _load_portfolio_risk(
+    tickers: tuple[str, ...],
+    allocation: tuple[float, ...],
+    confidence_levels: tuple[float, ...],
+    horizons: tuple[int, ...],
+    methods: tuple[str, ...],
+    as_of: date,
+) -> RiskReport:
+    returns_cube = load_returns_cube(tickers, allocation, as_of)
+    return compute_risk(
+        returns_cube.monthly_returns_df["portfolio_return"],
+        confidence_levels=confidence_levels,
+        horizons=horizons,
+        methods=methods,
+    )
+
+
+def get_rolling_risk(portfolio_df: pd.DataFrame, window: int) -> pd.DataFrame:
+    """Volatility, monthly VaR and drawdown of the portfolio over a window of
+    `window` sessions, on the dates with a full window."""
+    tickers, allocation, as_of = _cube_key(portfolio_df)
+    return _load_rolling_risk(tickers, allocation, window, as_of)
+
+
+@cached
+def _load_rolling_risk(
+    tickers: tuple[str, ...], allocation: tuple[float, ...], window: int, as_of: date
+) -> pd.DataFrame:
+    returns_cube = load_returns_cube(tickers, allocation, as_of)
+    daily_growth = returns_cube.daily_growth_df["portfolio_growth"]
+    daily_returns = returns_cube.daily_returns_df["portfolio_return"]
+
+    return pd.concat(
+        [
+            rolling_volatility(daily_returns, window),
+            rolling_value_at_risk(daily_returns, window, scale=21),
+            rolling_drawdown(daily_growth, window),
+        ],
+        axis=1,
+    ).dropna()
@@ -0,0 +1,263 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.metrics import period_end_rows
+from portfolio_analyzer.price_panel import PricePanel
+from portfolio_analyzer.profiling import traced
+
+# Pandas aliases of the calendar rebalancing frequencies
+REBALANCING_FREQUENCIES = {"monthly": "ME", "quarterly": "QE", "annually": "YE"}
+# Values gathered at a time at most, bounds the memory of a backtest
+CHUNK_ELEMENTS = 2**22
+# Check dates scanned per step while looking for drift threshold breaches
+LOOKAHEAD_CHECKS = 16
+
+
+@dataclass(frozen=True)
+class RebalancingPolicy:
+    """When a portfolio is brought back to its target allocation.
+
+    Weights are checked at the end of every `frequency` period ("monthly",
+    "quarterly" or "annually"), or every session when it is None. A check
+    rebalances when some weight drifted more than `threshold` (a fraction,
+    0.05 for 5 percentage points) from its target, or always without a
+    threshold. Without both, the portfolio is bought and held.
+
+    Trades cost `transaction_cost` times the traded value.
+    """
+
+    frequency: str | None = None
+    threshold: float | None = None
+    transaction_cost: float = 0.0
+
+    def __post_init__(self):
+        if self.frequency is not None and self.frequency not in REBALANCING_FREQUENCIES:
+            raise ValueError(
+                f"Unknown rebalancing frequency '{self.frequency}', "
+                f"expected one of: {', '.join(REBALANCING_FREQUENCIES)}"
+            )
+
+    @property
+    def label(self) -> str:
+        if self.frequency is None and self.threshold is None:
+            label = "Buy and hold"
+        elif self.threshold is None:
+            label = self.frequency.capitalize()
+        else:
+            label = (
+                f"{self.frequency or 'daily'} {self.threshold:.0%} drift".capitalize()
+            )
+
+        if self.transaction_cost:
+            label += f", {self.transaction_cost:.2%} cost"
+        return label
+
+
+@dataclass
+class BacktestResult:
+    """Backtest of every policy combined with every allocation.
+
+    Arrays are shaped (..., n_policies, n_allocations), `growth` starts at 1.
+    Turnover is the traded value over the portfolio value, summed over all
+    rebalancings, and costs are in units of the starting value.
+    """
+
+    dates: pd.DatetimeIndex
+    policies: list[RebalancingPolicy]
+    growth: np.ndarray
+    num_rebalancings: np.ndarray
+    turnover: np.ndarray
+    costs: np.ndarray
+
+    def growth_df(self, allocation: int = 0) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.growth[:, :, allocation],
+            index=self.dates,
+            columns=[policy.label for policy in self.policies],
+        )
+
+
+def _check_rows(dates: pd.DatetimeIndex, frequency: str | None) -> np.ndarray:
+    if frequency is None:
+        return np.arange(1, len(dates))
+
+    # Rebalance on the last session of every period, not on the last date
+    rows = period_end_rows(dates, REBALANCING_FREQUENCIES[frequency]).to_numpy()
+    return rows[(rows > 0) & (rows < len(dates) - 1)]
+
+
+def _threshold_rebalancings(
+    values: np.ndarray,
+    weights: np.ndarray,
+    check_rows: np.ndarray,
+    threshold: float,
+) -> np.ndarray:
+    """Rows where each allocation drifts past `threshold` since its last
+    rebalancing, as an (n_dates, n_allocations) mask.
+
+    Every step looks `LOOKAHEAD_CHECKS` check dates ahead for all allocations
+    at once (their lookahead values are the only ones gathered) and
+    rebalances on the first breach. Allocations without a breach keep their
+    segment start and scan further, so the number of steps is about the
+    number of checks over the lookahead plus the rebalancings.
+    """
+    n_dates = len(values)
+    num_allocations = len(weights)
+    rebalancings = np.zeros((n_dates, num_allocations), dtype=bool)
+
+    segment_start = np.zeros(num_allocations, dtype=int)
+    next_check = np.zeros(num_allocations, dtype=int)
+    active = np.arange(num_allocations) if len(check_rows) else np.empty(0, int)
+
+    # Assets first, so that the reductions over them are elementwise
+    values_by_asset = values.T
+    weights_by_asset = weights.T[:, :, None]
+
+    lookahead = np.arange(LOOKAHEAD_CHECKS)
+    while len(active):
+        positions = next_check[active, None] + lookahead
+        valid = positions < len(check_rows)
+        rows = check_rows[np.minimum(positions, len(check_rows) - 1)]
+
+        active_weights = weights_by_asset[:, active]
+        drifted = active_weights * (
+            values_by_asset[:, rows] / values_by_asset[:, segment_start[active], None]
+        )
+        drifted /= drifted.sum(axis=0)
+        breach = valid & (np.abs(drifted - active_weights).max(axis=0) > threshold)
+
+        hit = breach.any(axis=1)
+        first = breach.argmax(axis=1)
+        hit_allocations = active[hit]
+        hit_rows = rows[hit, first[hit]]
+        rebalancings[hit_rows, hit_allocations] = True
+        segment_start[hit_allocations] = hit_rows
+
+        next_check[active] += np.where(hit, first + 1, LOOKAHEAD_CHECKS)
+        active = active[next_check[active] < len(check_rows)]
+
+    return rebalancings
+
+
+def _rebalanced_growth(
+    values: np.ndarray,
+    weights: np.ndarray,
+    rebalancings: np.ndarray,
+    transaction_cost: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Growth of allocations rebalanced on the `rebalancings` rows, with the
+    turnover of every rebalancing at its row."""
+    n_dates = len(values)
+    rows = np.arange(n_dates)[:, None]
+    segment_start = np.maximum.accumulate(np.where(rebalancings, rows, 0), axis=0)
+
+    # Value relative to the segment start is the drifted buy-and-hold growth
+    if (segment_start == segment_start[:, :1]).all():
+        segment_growth = (values / values[segment_start[:, 0]]) @ weights.T
+    else:
+        segment_growth = np.einsum(
+            "tka,ka->tk", values[:, None, :] / values[segment_start], weights
+        )
+
+    # Growth of the previous segment up to each rebalancing, minus the costs
+    rebalance_rows, allocations = np.nonzero(rebalancings)
+    previous_start = segment_start[rebalance_rows - 1, allocations]
+    drifted = weights[allocations] * (values[rebalance_rows] / values[previous_start])
+    growth_before = drifted.sum(axis=1)
+    turnover = np.abs(weights[allocations] - drifted / growth_before[:, None]).sum(
+        axis=1
+    )
+
+    factors = np.ones_like(segment_growth)
+    factors[rebalance_rows, allocations] = growth_before * (
+        1 - transaction_cost * turnover
+    )
+    turnovers = np.zeros_like(segment_growth)
+    turnovers[rebalance_rows, allocations] = turnover
+
+    return np.cumprod(factors, axis=0) * segment_growth, turnovers
+
+
+@traced("backtest")
+def run_backtest(
+    prices: PricePanel | pd.DataFrame,
+    weights: np.ndarray,
+    policies: list[RebalancingPolicy],
+) -> BacktestResult:
+    """Backtests a (n_allocations, n_assets) matrix of target allocations
+    (fractions summing to 1, in the column order of `prices`) under every
+    policy, over the sessions where all assets have prices.
+
+    Growth between rebalancings is the buy-and-hold growth from the last one,
+    so every allocation and policy is simulated with array operations over
+    whole segments instead of a loop over sessions.
+    """
+    if isinstance(prices, PricePanel):
+        rows = prices.common_range
+        dates = prices.dates[rows]
+        values = prices.values[rows].astype(np.float64, copy=False)
+    else:
+        prices = prices.dropna(how="any")
+        dates = pd.DatetimeIndex(prices.index)
+        values = prices.to_numpy(dtype=np.float64)
+
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if weights.shape[1] != values.shape[1]:
+        raise ValueError(
+            f"Expected weights for {values.shape[1]} assets, got {weights.shape[1]}."
+        )
+
+    n_dates, num_assets = values.shape
+    shape = (len(policies), len(weights))
+    growth = np.empty((n_dates, *shape))
+    num_rebalancings = np.zeros(shape, dtype=int)
+    turnover = np.zeros(shape)
+    costs = np.zeros(shape)
+
+    chunk = max(1, CHUNK_ELEMENTS // (n_dates * num_assets))
+    for p, policy in enumerate(policies):
+        check_rows = _check_rows(dates, policy.frequency)
+
+        if policy.threshold is not None:
+            all_rebalancings = _threshold_rebalancings(
+                values, weights, check_rows, policy.threshold
+            )
+        else:
+            # Calendar rebalancings are shared by all allocations
+            all_rebalancings = np.zeros((n_dates, 1), dtype=bool)
+            if policy.frequency is not None:
+                all_rebalancings[check_rows] = True
+
+        for start in range(0, len(weights), chunk):
+            allocations = slice(start, start + chunk)
+            chunk_weights = weights[allocations]
+            rebalancings = np.broadcast_to(
+                all_rebalancings[:, allocations]
+                if policy.threshold is not None
+                else all_rebalancings,
+                (n_dates, len(chunk_weights)),
+            )
+
+            chunk_growth, chunk_turnover = _rebalanced_growth(
+                values, chunk_weights, rebalancings, policy.transaction_cost
+            )
+            growth[:, p, allocations] = chunk_growth
+            num_rebalancings[p, allocations] = rebalancings.sum(axis=0)
+            turnover[p, allocations] = chunk_turnover.sum(axis=0)
+
+            # Paid out of the value just before trading, in units of the start
+            cost_rate = policy.transaction_cost * chunk_turnover
+            costs[p, allocations] = (cost_rate * chunk_growth / (1 - cost_rate)).sum(
+                axis=0
+            )
+
+    return BacktestResult(
+        dates=dates,
+        policies=list(policies),
+        growth=growth,
+        num_rebalancings=num_rebalancings,
+        turnover=turnover,
+        costs=costs,
+    )
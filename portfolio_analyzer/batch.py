@@ -0,0 +1,240 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer import panel_store
+from portfolio_analyzer.config import PRICE_PANEL_DTYPE
+from portfolio_analyzer.drawdown import summarize_drawdowns
+from portfolio_analyzer.interest_data_service import load_risk_free_rates
+from portfolio_analyzer.market_data_providers import get_provider
+from portfolio_analyzer.market_data_service import get_price_panel
+from portfolio_analyzer.metrics import evaluate_portfolios
+from portfolio_analyzer.price_panel import PricePanel
+from portfolio_analyzer.risk import compute_risk
+from portfolio_analyzer.simulation import estimate_return_model, simulate_allocations
+
+# Portfolios of the same assets analyzed together, bounds the memory of the
+# forecast accumulators of a task
+TASK_PORTFOLIOS = 32
+# Percentiles of the forecast terminal value reported per portfolio
+FORECAST_PERCENTILES = (5, 50, 95)
+RESULT_FORMATS = (".parquet", ".json")
+
+# Panel and risk-free rates of a worker process, set by `_init_worker`
+_worker_panel: PricePanel | None = None
+_worker_risk_free_rates: pd.Series | None = None
+
+
+def _read_portfolio_file(path: Path) -> dict[str, pd.DataFrame]:
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    elif path.suffix == ".csv":
+        df = pd.read_csv(path)
+    else:
+        raise ValueError(
+            f"Unsupported portfolio file '{path}', expected CSV or Parquet."
+        )
+
+    missing = {"ticker", "allocation"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing column(s) in '{path}': {', '.join(sorted(missing))}")
+
+    if "portfolio" not in df.columns:
+        return {path.stem: df[["ticker", "allocation"]]}
+
+    return {
+        str(name): portfolio_df[["ticker", "allocation"]]
+        for name, portfolio_df in df.groupby("portfolio", sort=False)
+    }
+
+
+def read_portfolios(paths: list[Path]) -> dict[str, pd.DataFrame]:
+    """Portfolios defined in CSV or Parquet files with ticker and allocation
+    (in %) columns, by name.
+
+    A file with a portfolio column holds several portfolios, otherwise it is
+    one portfolio named after the file. Directories are read file by file.
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted([*path.glob("*.csv"), *path.glob("*.parquet")]))
+        else:
+            files.append(path)
+
+    portfolios = {}
+    for file_path in files:
+        for name, portfolio_df in _read_portfolio_file(file_path).items():
+            if name in portfolios:
+                raise ValueError(f"Portfolio '{name}' is defined more than once.")
+
+            total = portfolio_df["allocation"].sum()
+            if not np.isclose(total, 100):
+                raise ValueError(
+                    f"Allocations of portfolio '{name}' sum to {total}, expected 100."
+                )
+            portfolios[name] = portfolio_df.reset_index(drop=True)
+
+    return portfolios
+
+
+def _tasks(portfolios: dict[str, pd.DataFrame]):
+    """Portfolios grouped by their assets, as (tickers, names, weights) with
+    at most `TASK_PORTFOLIOS` rows of weights (fractions) per task."""
+    groups: dict[tuple[str, ...], list[tuple[str, pd.Series]]] = {}
+    for name, portfolio_df in portfolios.items():
+        allocation = portfolio_df.groupby("ticker")["allocation"].sum()
+        groups.setdefault(tuple(allocation.index), []).append((name, allocation))
+
+    for tickers, members in groups.items():
+        for start in range(0, len(members), TASK_PORTFOLIOS):
+            chunk = members[start : start + TASK_PORTFOLIOS]
+            weights = np.array([allocation.to_numpy() for _, allocation in chunk])
+            yield list(tickers), [name for name, _ in chunk], weights / 100
+
+
+def _init_worker(panel_key: str, risk_free_rates: pd.Series) -> None:
+    global _worker_panel, _worker_risk_free_rates
+
+    # Every worker maps the panel stored by the parent instead of loading the
+    # prices, tasks only copy the columns of their assets out of it
+    _worker_panel = panel_store.load_panel(panel_key)
+    if _worker_panel is None:
+        raise RuntimeError(f"Price panel {panel_key} is missing from the store.")
+    _worker_risk_free_rates = risk_free_rates
+
+
+def _analyze_task(tickers: list[str], names: list[str], *args) -> pd.DataFrame:
+    """Results of a task, or its error on every row so that one portfolio
+    which can't be analyzed (e.g. assets without common history) doesn't
+    abort the whole run."""
+    try:
+        results_df = _analyze_portfolios(tickers, names, *args)
+    except Exception as e:
+        return pd.DataFrame({"portfolio": names, "error": f"{type(e).__name__}: {e}"})
+
+    results_df["error"] = None
+    return results_df
+
+
+def _analyze_portfolios(
+    tickers: list[str],
+    names: list[str],
+    weights: np.ndarray,
+    confidence_level: float,
+    num_simulations: int,
+    horizon: int,
+    seed: int,
+) -> pd.DataFrame:
+    panel = _worker_panel.select(tickers)
+    evaluation = evaluate_portfolios(
+        panel,
+        weights,
+        risk_free_rate_series=_worker_risk_free_rates,
+        confidence_level=confidence_level,
+    )
+    drawdowns = summarize_drawdowns(evaluation.growth)
+
+    daily_returns = evaluation.growth[1:] / evaluation.growth[:-1] - 1
+    risk = compute_risk(
+        daily_returns,
+        confidence_levels=(confidence_level,),
+        methods=("historical",),
+    )
+
+    forecasts = simulate_allocations(
+        estimate_return_model(panel),
+        weights,
+        days=horizon,
+        num_simulations=num_simulations,
+        start_value=1,
+        percentiles=FORECAST_PERCENTILES,
+        num_sample_paths=0,
+        seed=seed,
+    )
+
+    results_df = pd.DataFrame(
+        {
+            "portfolio": names,
+            "num_assets": len(tickers),
+            "start_date": evaluation.dates[0],
+            "end_date": evaluation.dates[-1],
+            "arr": evaluation.arr,
+            "volatility": evaluation.volatility,
+            "sharpe_ratio": evaluation.sharpe_ratio,
+            "max_drawdown": evaluation.max_drawdown,
+            "monthly_value_at_risk": evaluation.value_at_risk,
+            "daily_value_at_risk": risk.value_at_risk[0, 0, 0],
+            "daily_expected_shortfall": risk.expected_shortfall[0, 0, 0],
+            "ulcer_index": drawdowns["ulcer_index"].to_numpy(),
+            "calmar_ratio": drawdowns["calmar_ratio"].to_numpy(),
+            "forecast_mean": [forecast.terminal_mean for forecast in forecasts],
+            "forecast_std": [forecast.terminal_std for forecast in forecasts],
+            "forecast_probability_of_loss": [
+                forecast.terminal_probability_of_loss for forecast in forecasts
+            ],
+        }
+    )
+    for percentile in FORECAST_PERCENTILES:
+        results_df[f"forecast_p{percentile}"] = [
+            forecast.bands_df[f"p{percentile}"].iloc[-1] for forecast in forecasts
+        ]
+    return results_df
+
+
+def analyze_portfolios(
+    portfolios: dict[str, pd.DataFrame],
+    confidence_level: float = 0.95,
+    num_simulations: int = 1_000,
+    horizon: int = 252,
+    seed: int = 0,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """Returns, risk and forecast metrics of every portfolio, one row each in
+    the order of `portfolios`, with the reason in the error column for those
+    which could not be analyzed.
+
+    Prices of all assets are loaded once into a stored panel which `workers`
+    processes map read-only. Portfolios holding the same assets are evaluated
+    together as a matrix of allocations. Forecasts are the portfolio value
+    after `horizon` days for a start value of 1.
+    """
+    tickers = sorted({t for df in portfolios.values() for t in df["ticker"]})
+    # Stores the panel for the workers under the key they load it from
+    get_price_panel(tickers)
+    panel_key = panel_store.panel_key(get_provider().name, tickers, PRICE_PANEL_DTYPE)
+    risk_free_rates = load_risk_free_rates()[0]["rate"]
+
+    task_args = [
+        (*task, confidence_level, num_simulations, horizon, seed)
+        for task in _tasks(portfolios)
+    ]
+    if workers == 1:
+        _init_worker(panel_key, risk_free_rates)
+        results = [_analyze_task(*args) for args in task_args]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(panel_key, risk_free_rates),
+        ) as executor:
+            results = list(executor.map(_analyze_task, *zip(*task_args)))
+
+    results_df = pd.concat(results, ignore_index=True)
+    return results_df.set_index("portfolio").loc[list(portfolios)].reset_index()
+
+
+def check_output_path(path: Path) -> None:
+    if Path(path).suffix not in RESULT_FORMATS:
+        raise ValueError(f"Unsupported output file '{path}', expected JSON or Parquet.")
+
+
+def write_results(results_df: pd.DataFrame, path: Path) -> None:
+    check_output_path(path)
+    path = Path(path)
+    if path.suffix == ".parquet":
+        results_df.to_parquet(path, index=False)
+    else:
+        results_df.to_json(path, orient="records", date_format="iso", indent=2)
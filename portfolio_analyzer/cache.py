@@ -0,0 +1,344 @@
+import copy
+import dataclasses
+import functools
+import hashlib
+import inspect
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.config import MAX_FAILURE_BACKOFF, RESULT_CACHE_MAX_BYTES
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    entries: int
+    size: int
+    max_size: int
+    # Calls answered by waiting on the same call of another thread
+    coalesced: int
+    # Calls answered with a failure still in its backoff
+    failure_hits: int
+
+
+def _update_hash(hasher, value) -> None:
+    """Feeds the content of `value` to `hasher`, equal inputs (even distinct
+    objects) give equal hashes."""
+    if isinstance(value, pd.DataFrame):
+        hasher.update(b"DataFrame")
+        hasher.update(repr((list(value.columns), list(value.dtypes))).encode())
+        hasher.update(pd.util.hash_pandas_object(value, index=True).to_numpy())
+    elif isinstance(value, pd.Series | pd.Index):
+        hasher.update(type(value).__name__.encode())
+        hasher.update(repr((value.name, value.dtype)).encode())
+        hasher.update(pd.util.hash_pandas_object(value).to_numpy())
+    elif isinstance(value, np.ndarray):
+        hasher.update(repr((value.dtype, value.shape)).encode())
+        hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, list | tuple):
+        hasher.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_hash(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(f"dict{len(value)}".encode())
+        for key, item in sorted(value.items(), key=lambda kv: repr(kv[0])):
+            _update_hash(hasher, key)
+            _update_hash(hasher, item)
+    elif value is None or isinstance(value, str | int | float | date | datetime):
+        hasher.update(f"{type(value).__name__}:{value!r}".encode())
+    else:
+        hasher.update(pickle.dumps(value))
+
+
+def _sizeof(value, seen: set | None = None) -> int:
+    """Approximate memory held by `value`, counting shared objects once."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame | pd.Series | pd.Index):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.memmap):
+        # File-backed pages are shared between processes and reclaimable
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(
+            _sizeof(getattr(value, field.name), seen)
+            for field in dataclasses.fields(value)
+        )
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            _sizeof(key, seen) + _sizeof(item, seen) for key, item in value.items()
+        )
+    if isinstance(value, list | tuple | set):
+        return sys.getsizeof(value) + sum(_sizeof(item, seen) for item in value)
+    return sys.getsizeof(value)
+
+
+def _fresh_exception(error: BaseException) -> BaseException:
+    """A new instance of `error` to raise instead of it.
+
+    Raising a shared exception again adds frames to its traceback each time,
+    and every thread raising it modifies the same object. Exceptions which
+    can't be rebuilt from their arguments are returned as is.
+    """
+    try:
+        return copy.copy(error)
+    except TypeError:
+        return error
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time. Callers of a key with a call
+    in flight wait for it and share its result, or raise a copy of its
+    exception."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func, *args, **kwargs) -> tuple[object, bool]:
+        """Returns the result of `func` and whether it came from the call of
+        another thread."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            error = future.exception()
+            if error is not None:
+                raise _fresh_exception(error) from error
+            return future.result(), True
+
+        try:
+            value = func(*args, **kwargs)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ResultCache:
+    """Process-wide cache of computation results, shared by all sessions.
+
+    Entries are keyed by a hash of the function and its arguments and are
+    evicted least recently used first once their total size exceeds
+    `max_size` bytes. Entries may also expire after a time to live. Cached
+    values are returned as is, callers must not modify them.
+
+    Failures can be kept too, to be raised again until their backoff ends,
+    which doubles with every consecutive failure of the same key.
+    """
+
+    def __init__(self, max_size: int = RESULT_CACHE_MAX_BYTES):
+        self.max_size = max_size
+        # Key to (value, size, expiry on the monotonic clock or None)
+        self._entries: OrderedDict[str, tuple[object, int, float | None]] = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._coalesced = 0
+        self._failure_hits = 0
+        # Key to (exception, consecutive failures, end of the backoff)
+        self._failures: dict[str, tuple[BaseException, int, float]] = {}
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+
+    def make_key(self, func, args: tuple, kwargs: dict) -> str:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{func.__module__}.{func.__qualname__}".encode())
+        _update_hash(hasher, dict(bound.arguments))
+        return hasher.hexdigest()
+
+    def _lookup(self, key: str) -> tuple[bool, object]:
+        """Must be called holding the lock."""
+        if key in self._entries:
+            value, size, expiry = self._entries[key]
+            if expiry is None or time.monotonic() < expiry:
+                self._entries.move_to_end(key)
+                return True, value
+
+            del self._entries[key]
+            self._size -= size
+            self._expirations += 1
+
+        return False, None
+
+    def get(self, key: str) -> tuple[bool, object]:
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return hit, value
+
+    def peek(self, key: str) -> tuple[bool, object]:
+        """As `get`, without counting a hit or a miss."""
+        with self._lock:
+            return self._lookup(key)
+
+    def get_failure(self, key: str) -> BaseException | None:
+        """The last failure of `key` while its backoff lasts."""
+        with self._lock:
+            if key not in self._failures:
+                return None
+
+            error, _, retry_at = self._failures[key]
+            if time.monotonic() >= retry_at:
+                return None
+
+            self._failure_hits += 1
+            return error
+
+    def put_failure(self, key: str, error: BaseException, backoff: timedelta) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # Failures whose backoff ended long ago start over
+            self._failures = {
+                failed_key: failure
+                for failed_key, failure in self._failures.items()
+                if failure[2] > now - MAX_FAILURE_BACKOFF.total_seconds()
+            }
+
+            failures = self._failures.get(key, (None, 0, 0.0))[1] + 1
+            delay = min(
+                backoff.total_seconds() * 2 ** (failures - 1),
+                MAX_FAILURE_BACKOFF.total_seconds(),
+            )
+            self._failures[key] = (error, failures, now + delay)
+
+    def put(self, key: str, value, ttl: timedelta | None = None) -> None:
+        size = _sizeof(value)
+        # Larger than the whole budget, it would only flush everything else
+        if size > self.max_size:
+            return
+
+        expiry = None if ttl is None else time.monotonic() + ttl.total_seconds()
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, expiry)
+            self._size += size
+            self._failures.pop(key, None)
+
+            while self._size > self.max_size:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._failures.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                entries=len(self._entries),
+                size=self._size,
+                max_size=self.max_size,
+                coalesced=self._coalesced,
+                failure_hits=self._failure_hits,
+            )
+
+    def _count_coalesced(self) -> None:
+        with self._lock:
+            self._coalesced += 1
+
+
+RESULT_CACHE = ResultCache()
+
+
+def cached(
+    func=None,
+    *,
+    ttl: timedelta | None = None,
+    cache: ResultCache | None = None,
+    backoff: timedelta | None = None,
+):
+    """Caches the results of `func` in `cache` (the shared `RESULT_CACHE` by
+    default) for `ttl`, or until evicted. Usable as `@cached` or
+    `@cached(ttl=...)`.
+
+    Concurrent calls with the same arguments run `func` once, the others wait
+    for its result. With a `backoff`, a failure is raised again without
+    calling `func` for `backoff`, doubled after every further failure up to
+    `MAX_FAILURE_BACKOFF`.
+    """
+
+    def decorator(func):
+        def compute(result_cache: ResultCache, key: str, args, kwargs):
+            # Another thread may have stored it since this one missed
+            hit, value = result_cache.peek(key)
+            if hit:
+                return value
+
+            try:
+                value = func(*args, **kwargs)
+            except Exception as error:
+                if backoff is not None:
+                    result_cache.put_failure(key, error, backoff)
+                raise
+
+            result_cache.put(key, value, ttl)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result_cache = RESULT_CACHE if cache is None else cache
+            key = result_cache.make_key(func, args, kwargs)
+
+            hit, value = result_cache.get(key)
+            if hit:
+                return value
+
+            error = result_cache.get_failure(key)
+            if error is not None:
+                raise _fresh_exception(error) from error
+
+            value, coalesced = result_cache.flights.do(
+                key, compute, result_cache, key, args, kwargs
+            )
+            if coalesced:
+                result_cache._count_coalesced()
+            return value
+
+        return wrapper
+
+    return decorator if func is None else decorator(func)
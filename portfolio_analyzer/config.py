@@ -1,5 +1,60 @@
+import os
+from datetime import timedelta
 from pathlib import Path
 
 
 DATA_PATH = Path(__file__).parent.parent / "data"
-EURIBOR_3M_PATH = DATA_PATH / "euribor_3m.csv"
+
+# Interest rate curves, as ECB data portal CSV exports (date, period, rate in
+# %) in the data directory
+RATE_CURVES = {"euribor_3m": "euribor_3m.csv"}
+# Curve used as the risk-free rate, one of RATE_CURVES
+RISK_FREE_CURVE = os.environ.get("PORTFOLIO_ANALYZER_RISK_FREE_CURVE", "euribor_3m")
+# Rate curves compiled to binary files, rebuilt when their CSV changes
+RATE_STORE_PATH = DATA_PATH / "rates"
+
+# One of "yahoo", "local" or "synthetic"
+MARKET_DATA_PROVIDER = os.environ.get("PORTFOLIO_ANALYZER_PROVIDER", "yahoo")
+# Price and metadata files served by the "local" provider
+FIXTURES_PATH = Path(
+    os.environ.get("PORTFOLIO_ANALYZER_FIXTURES_PATH", DATA_PATH / "fixtures")
+)
+# The "synthetic" provider generates business-day prices over a fixed calendar
+SYNTHETIC_SEED = int(os.environ.get("PORTFOLIO_ANALYZER_SYNTHETIC_SEED", "42"))
+SYNTHETIC_START = "2000-01-03"
+SYNTHETIC_END = "2025-12-31"
+
+PRICE_STORE_PATH = DATA_PATH / "prices"
+# Price panels memory-mapped by every session and process that uses them
+PRICE_PANEL_PATH = DATA_PATH / "panels"
+# Stored histories younger than this are served without asking the provider
+PRICE_STORE_MAX_AGE = timedelta(hours=12)
+
+METADATA_STORE_PATH = DATA_PATH / "metadata"
+# Names and currencies rarely change, stored details are kept longer
+METADATA_STORE_MAX_AGE = timedelta(days=7)
+
+# Memory budget of the cache of computed results shared by all sessions
+RESULT_CACHE_MAX_BYTES = (
+    int(os.environ.get("PORTFOLIO_ANALYZER_CACHE_MB", "512")) * 1024 * 1024
+)
+
+# Upper bound on concurrent provider requests when loading several tickers
+MAX_DOWNLOAD_WORKERS = 16
+# Failed provider requests are answered with their error for this long,
+# doubled after every consecutive failure up to the maximum
+PROVIDER_FAILURE_BACKOFF = timedelta(seconds=5)
+MAX_FAILURE_BACKOFF = timedelta(minutes=5)
+
+# Element type of the price panel, "float32" halves its memory
+PRICE_PANEL_DTYPE = "float64"
+
+# Seed of the Forecast page simulations, keeps them stable across reruns
+FORECAST_SEED = 42
+# Processes used by Monte Carlo simulations, each gets its own random stream
+SIMULATION_WORKERS = int(os.environ.get("PORTFOLIO_ANALYZER_SIMULATION_WORKERS", "1"))
+
+# Records timing spans and shows them in a sidebar panel of every page
+PROFILING = os.environ.get("PORTFOLIO_ANALYZER_PROFILING", "") == "1"
+# Most recent spans kept, older ones are dropped
+PROFILING_MAX_SPANS = 10_000
@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.profiling import traced
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+@dataclass
+class _Episodes:
+    """Drawdown episodes of a (n_dates, n_portfolios) growth block, as row
+    positions. `recovery` is -1 for episodes still under water at the end."""
+
+    column: np.ndarray
+    peak: np.ndarray
+    trough: np.ndarray
+    recovery: np.ndarray
+    depth: np.ndarray
+
+
+def _drawdowns(growth: np.ndarray) -> np.ndarray:
+    return growth / np.maximum.accumulate(growth, axis=0) - 1
+
+
+def _find_episodes(drawdowns: np.ndarray) -> _Episodes:
+    """Splits every column into runs under its running maximum.
+
+    Columns are laid end to end with a separating row at zero, so the runs of
+    all columns are found with the same vectorized scan.
+    """
+    n_dates, n_columns = drawdowns.shape
+    padded = np.zeros((n_dates + 1, n_columns))
+    padded[1:] = drawdowns
+    # Trailing zero so the last run ends inside the array
+    flat = np.append(padded.ravel(order="F"), 0.0)
+
+    underwater = flat < 0
+    edges = np.diff(underwater.astype(np.int8), append=np.int8(0))
+    starts = np.flatnonzero(edges == 1) + 1
+    ends = np.flatnonzero(edges == -1) + 1
+
+    if len(starts) == 0:
+        empty = np.empty(0, dtype=int)
+        return _Episodes(empty, empty, empty, empty, np.empty(0))
+
+    # Lowest point of every run, its first occurrence is the trough
+    depth = np.minimum.reduceat(flat, np.column_stack([starts, ends]).ravel())[::2]
+    run_starts = np.zeros(len(flat), dtype=int)
+    run_starts[starts] = 1
+    run_ids = np.cumsum(run_starts) - 1
+    is_trough = underwater & (flat == depth[run_ids])
+    _, first_trough = np.unique(run_ids[is_trough], return_index=True)
+    trough = np.flatnonzero(is_trough)[first_trough]
+
+    # Back to positions within the column, without the separating row
+    column = starts // (n_dates + 1)
+    offset = column * (n_dates + 1) + 1
+    recovery = ends - offset
+    recovered = ends % (n_dates + 1) != 0
+
+    return _Episodes(
+        column=column,
+        peak=starts - offset - 1,
+        trough=trough - offset,
+        recovery=np.where(recovered, recovery, -1),
+        depth=depth,
+    )
+
+
+@traced("risk")
+def compute_drawdown_episodes(growth_series: pd.Series) -> pd.DataFrame:
+    """Every drawdown of a daily growth series, deepest first.
+
+    Durations are counted in trading sessions. Episodes not recovered by the
+    end of the series have no recovery date and run until the last session.
+    """
+    dates = growth_series.index
+    drawdowns = _drawdowns(growth_series.to_numpy(dtype=np.float64)[:, None])
+    episodes = _find_episodes(drawdowns)
+
+    recovered = episodes.recovery >= 0
+    end = np.where(recovered, episodes.recovery, len(dates) - 1)
+
+    episodes_df = pd.DataFrame(
+        {
+            "peak_date": dates[episodes.peak],
+            "trough_date": dates[episodes.trough],
+            "recovery_date": pd.Series(dates[end]).where(recovered).to_numpy(),
+            "depth": episodes.depth * 100,
+            "duration": end - episodes.peak,
+            "time_to_trough": episodes.trough - episodes.peak,
+            "time_to_recover": np.where(
+                recovered, episodes.recovery - episodes.trough, np.nan
+            ),
+        }
+    )
+    return episodes_df.sort_values("depth", kind="stable").reset_index(drop=True)
+
+
+@traced("risk")
+def summarize_drawdowns(
+    growth: pd.DataFrame | np.ndarray, periods_per_year: int = TRADING_DAYS_PER_YEAR
+) -> pd.DataFrame:
+    """Drawdown profile of every column of a daily growth block, to rank
+    allocations (e.g. the `growth` of `evaluate_portfolios`).
+
+    Returns one row per column with the maximum drawdown and the Ulcer index
+    (root mean square drawdown) in %, the number of episodes, the longest
+    episode and longest recovery in sessions, and the Calmar ratio (annualized
+    return over maximum drawdown).
+    """
+    columns = growth.columns if isinstance(growth, pd.DataFrame) else None
+    growth = np.asarray(growth, dtype=np.float64)
+    if growth.ndim == 1:
+        growth = growth[:, None]
+    n_dates, n_columns = growth.shape
+
+    drawdowns = _drawdowns(growth)
+    episodes = _find_episodes(drawdowns)
+
+    end = np.where(episodes.recovery >= 0, episodes.recovery, n_dates - 1)
+    longest_duration = np.zeros(n_columns, dtype=int)
+    np.maximum.at(longest_duration, episodes.column, end - episodes.peak)
+
+    recovered = episodes.recovery >= 0
+    longest_recovery = np.zeros(n_columns, dtype=int)
+    np.maximum.at(
+        longest_recovery,
+        episodes.column[recovered],
+        episodes.recovery[recovered] - episodes.trough[recovered],
+    )
+
+    max_drawdown = drawdowns.min(axis=0) * 100
+    annualized_return = (
+        (growth[-1] / growth[0]) ** (periods_per_year / max(n_dates - 1, 1)) - 1
+    ) * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        calmar_ratio = annualized_return / np.abs(max_drawdown)
+
+    return pd.DataFrame(
+        {
+            "max_drawdown": max_drawdown,
+            "ulcer_index": np.sqrt((drawdowns**2).mean(axis=0)) * 100,
+            "num_episodes": np.bincount(episodes.column, minlength=n_columns),
+            "longest_duration": longest_duration,
+            "longest_recovery": longest_recovery,
+            "calmar_ratio": calmar_ratio,
+        },
+        index=columns,
+    )
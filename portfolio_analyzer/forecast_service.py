@@ -0,0 +1,144 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.cache import cached
+from portfolio_analyzer.config import FORECAST_SEED, SIMULATION_WORKERS
+from portfolio_analyzer.market_data_service import (
+    get_price_as_of,
+    get_price_panel,
+    get_returns_cube,
+)
+from portfolio_analyzer.metrics import compute_return_distribution
+from portfolio_analyzer.profiling import traced
+from portfolio_analyzer.simulation import (
+    ReturnModel,
+    SimulationResult,
+    compute_asset_returns,
+    estimate_return_model,
+    simulate_allocations,
+    simulate_bootstrap,
+    simulate_portfolio,
+)
+
+MIN_FORECAST_DAYS = 30
+MAX_FORECAST_DAYS = 360
+FORECAST_STEP_DAYS = 10
+# Labels shown on the Forecast page for the `return_model` of `get_forecast`
+FORECAST_RETURN_MODELS = {
+    "Portfolio": "portfolio",
+    "Correlated assets": "assets",
+    "Historical bootstrap": "bootstrap",
+    "Block bootstrap": "block_bootstrap",
+}
+# Mean block length of the block bootstrap, about a month of sessions
+BOOTSTRAP_BLOCK_LENGTH = 20
+
+
+def get_daily_returns(portfolio_df: pd.DataFrame) -> pd.Series:
+    return get_returns_cube(portfolio_df).daily_returns_df["portfolio_return"]
+
+
+def get_return_distribution(portfolio_df: pd.DataFrame) -> pd.DataFrame:
+    return _load_return_distribution(
+        portfolio_df, get_price_as_of(portfolio_df["ticker"].tolist())
+    )
+
+
+# Cached with the last price date of the assets, `as_of`, so that the results
+# below follow the price updates as the returns cube does
+@cached
+def _load_return_distribution(portfolio_df: pd.DataFrame, as_of: date) -> pd.DataFrame:
+    return compute_return_distribution(get_daily_returns(portfolio_df))
+
+
+def get_asset_returns(tickers: list[str]) -> np.ndarray:
+    return _load_asset_returns(tickers, get_price_as_of(tickers))
+
+
+@cached
+def _load_asset_returns(tickers: list[str], as_of: date) -> np.ndarray:
+    return compute_asset_returns(get_price_panel(tickers))
+
+
+@traced("simulation")
+def get_return_model(tickers: list[str]) -> ReturnModel:
+    return _load_return_model(tickers, get_price_as_of(tickers))
+
+
+@cached
+def _load_return_model(tickers: list[str], as_of: date) -> ReturnModel:
+    return estimate_return_model(get_price_panel(tickers))
+
+
+@traced("simulation")
+def get_forecast(
+    portfolio_df: pd.DataFrame,
+    num_simulations: int,
+    start_value: float,
+    return_model: str = "portfolio",
+    seed: int = FORECAST_SEED,
+) -> SimulationResult:
+    """Simulates the portfolio once over the longest horizon offered, shorter
+    horizons are served with `SimulationResult.at_horizon`.
+
+    `return_model` is "portfolio" to draw from a normal fitted to the
+    portfolio's daily returns, "assets" to draw correlated asset returns,
+    "bootstrap" to resample historical days independently or
+    "block_bootstrap" to resample them in blocks (stationary bootstrap).
+    """
+    return _load_forecast(
+        portfolio_df,
+        num_simulations,
+        start_value,
+        return_model,
+        seed,
+        get_price_as_of(portfolio_df["ticker"].tolist()),
+    )
+
+
+@cached
+def _load_forecast(
+    portfolio_df: pd.DataFrame,
+    num_simulations: int,
+    start_value: float,
+    return_model: str,
+    seed: int,
+    as_of: date,
+) -> SimulationResult:
+    simulation_kwargs = {
+        "num_simulations": num_simulations,
+        "start_value": start_value,
+        "seed": seed,
+        "workers": SIMULATION_WORKERS,
+    }
+
+    if return_model == "portfolio":
+        daily_returns = get_daily_returns(portfolio_df)
+        return simulate_portfolio(
+            daily_returns.mean(),
+            daily_returns.std(),
+            MAX_FORECAST_DAYS,
+            **simulation_kwargs,
+        )
+
+    tickers = portfolio_df["ticker"].tolist()
+    weights = portfolio_df["allocation"].to_numpy() / 100
+
+    if return_model == "assets":
+        return simulate_allocations(
+            get_return_model(tickers), weights, MAX_FORECAST_DAYS, **simulation_kwargs
+        )[0]
+
+    if return_model in ("bootstrap", "block_bootstrap"):
+        return simulate_bootstrap(
+            get_asset_returns(tickers),
+            weights,
+            MAX_FORECAST_DAYS,
+            method="iid" if return_model == "bootstrap" else "stationary",
+            block_length=BOOTSTRAP_BLOCK_LENGTH,
+            **simulation_kwargs,
+        )[0]
+
+    raise ValueError(f"Unknown return model '{return_model}'.")
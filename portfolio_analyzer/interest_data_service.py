@@ -1,18 +1,102 @@
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-from portfolio_analyzer.config import EURIBOR_3M_PATH
+from portfolio_analyzer.cache import cached
+from portfolio_analyzer.config import (
+    DATA_PATH,
+    RATE_CURVES,
+    RATE_STORE_PATH,
+    RISK_FREE_CURVE,
+)
+from portfolio_analyzer.profiling import traced
+
+
+def _curve_path(curve: str) -> Path:
+    if curve not in RATE_CURVES:
+        raise ValueError(
+            f"Unknown rate curve '{curve}', expected one of: {', '.join(RATE_CURVES)}"
+        )
+
+    return DATA_PATH / RATE_CURVES[curve]
+
+
+def _compile_curve(curve: str) -> tuple[np.ndarray, np.ndarray]:
+    """Dates (as datetime64[ns] int64) and annual rates in % of `curve`.
+
+    The CSV export (date, period, rate) is parsed once into a binary file
+    next to the other rate curves, it is parsed again only when the CSV is
+    modified.
+    """
+    csv_path = _curve_path(curve)
+    compiled_path = RATE_STORE_PATH / f"{curve}.npz"
+    if (
+        compiled_path.exists()
+        and compiled_path.stat().st_mtime >= csv_path.stat().st_mtime
+    ):
+        with np.load(compiled_path) as compiled:
+            return compiled["dates"], compiled["rates"]
+
+    df = pd.read_csv(csv_path, usecols=[0, 2], parse_dates=[0])
+    dates = df.iloc[:, 0].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    rates = df.iloc[:, 1].to_numpy(dtype=np.float64)
+
+    RATE_STORE_PATH.mkdir(parents=True, exist_ok=True)
+    # Written next to the target and swapped, so readers never see a partial file
+    tmp_path = RATE_STORE_PATH / f"{curve}.{uuid.uuid4().hex}.tmp.npz"
+    np.savez(tmp_path, dates=dates, rates=rates)
+    os.replace(tmp_path, compiled_path)
+    return dates, rates
+
 
+@cached
+def _load_curve(curve: str, modified_at: float) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """`modified_at` is the CSV modification time, an updated CSV gets new
+    entries."""
+    dates, rates = _compile_curve(curve)
+    df = pd.DataFrame(
+        {"rate": rates},
+        index=pd.DatetimeIndex(dates.view("datetime64[ns]"), name="date"),
+    )
 
-def load_risk_free_rates() -> tuple[pd.DataFrame, pd.DataFrame]:
+    monthly_df = df.resample("ME").last()
+    monthly_df["rate"] = ((1 + monthly_df["rate"] / 100) ** (1 / 12) - 1) * 100
+
+    annual_df = df.resample("YE").mean()
+    return monthly_df, annual_df
+
+
+@traced("data")
+def load_risk_free_rates(
+    curve: str = RISK_FREE_CURVE,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Returns:
     - monthly_df
     - annual_df
     """
-    df = pd.read_csv(EURIBOR_3M_PATH, usecols=[0, 2], parse_dates=[0])
-    df.columns = ["date", "rate"]
+    return _load_curve(curve, _curve_path(curve).stat().st_mtime)
 
-    monthly_df = df.resample("ME", on="date").last()
-    monthly_df["rate"] = ((1 + monthly_df["rate"] / 100) ** (1 / 12) - 1) * 100
 
-    annual_df = df.resample("YE", on="date").mean()
-    return monthly_df, annual_df
+@cached
+def _daily_risk_free_rates(
+    dates: pd.DatetimeIndex, monthly_rates: pd.Series
+) -> pd.Series:
+    # Sessions past the last published month keep its rate
+    session_rates = monthly_rates.reindex(
+        dates.to_period("M").to_timestamp("M")
+    ).ffill()
+
+    daily_rates = (1 + session_rates.to_numpy() / 100) ** (12 / 252) - 1
+    return pd.Series(daily_rates, index=dates, name="rate")
+
+
+def get_daily_risk_free_rates(
+    dates: pd.DatetimeIndex, curve: str = RISK_FREE_CURVE
+) -> pd.Series:
+    """Daily risk-free rate (as a fraction) of every session in `dates`,
+    compounded from the rate of its month."""
+    monthly_df, _ = load_risk_free_rates(curve)
+    return _daily_risk_free_rates(dates, monthly_df["rate"])
@@ -0,0 +1,197 @@
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date
+from functools import cache
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.config import (
+    FIXTURES_PATH,
+    MARKET_DATA_PROVIDER,
+    SYNTHETIC_END,
+    SYNTHETIC_SEED,
+    SYNTHETIC_START,
+)
+
+
+class MarketDataProvider(ABC):
+    """Source of ticker metadata and daily price histories.
+
+    Histories are DataFrames indexed by tz-naive session date with at least a
+    "Close" column.
+    """
+
+    name: str
+    # Whether fetched histories should be kept in the local price store
+    persistent: bool = False
+
+    @abstractmethod
+    def get_ticker_details(self, ticker: str) -> dict:
+        pass
+
+    @abstractmethod
+    def get_price_history(self, ticker: str, start: date | None = None) -> pd.DataFrame:
+        pass
+
+    def get_price_histories(
+        self, tickers: list[str], start: date | None = None
+    ) -> dict[str, pd.DataFrame]:
+        """Histories of several tickers at once, fetched this way only from
+        providers that aren't persistent. Persistent ones are refreshed ticker
+        by ticker from their last stored bar."""
+        return {ticker: self.get_price_history(ticker, start) for ticker in tickers}
+
+
+class YahooFinanceProvider(MarketDataProvider):
+    name = "yahoo"
+    persistent = True
+
+    @staticmethod
+    def _ticker(ticker: str):
+        # Imported on use, only this provider needs yfinance and it is slow
+        # to import
+        import yfinance as yf
+
+        return yf.Ticker(ticker)
+
+    def get_ticker_details(self, ticker: str) -> dict:
+        data = self._ticker(ticker).get_info()
+
+        if "longName" not in data.keys():
+            raise ValueError(f"Ticker '{ticker}' doesn't exist.")
+
+        return {
+            "name": data["longName"],
+            "currency": data["currency"],
+            "shortName": data["shortName"],
+        }
+
+    def get_price_history(self, ticker: str, start: date | None = None) -> pd.DataFrame:
+        yticker = self._ticker(ticker)
+
+        if start is None:
+            history_df = yticker.history(period="max", interval="1d")
+        else:
+            history_df = yticker.history(start=start, interval="1d")
+
+        if not history_df.empty:
+            # Key bars by the exchange-local session date
+            history_df.index = history_df.index.tz_localize(None).normalize()
+        history_df.index.name = "date"
+        return history_df
+
+
+class LocalFileProvider(MarketDataProvider):
+    """Serves `<ticker>.parquet` or `<ticker>.csv` files from a fixtures
+    directory. Ticker names are read from an optional `tickers.csv` with
+    ticker, name, currency and shortName columns."""
+
+    name = "local"
+
+    def __init__(self, path=FIXTURES_PATH):
+        self.path = path
+
+    def _find_file(self, ticker: str):
+        for suffix in (".parquet", ".csv"):
+            file_path = self.path / f"{ticker}{suffix}"
+            if file_path.exists():
+                return file_path
+
+        raise ValueError(f"Ticker '{ticker}' doesn't exist.")
+
+    def get_ticker_details(self, ticker: str) -> dict:
+        self._find_file(ticker)
+
+        details = {"name": ticker, "currency": "EUR", "shortName": ticker}
+        tickers_path = self.path / "tickers.csv"
+        if tickers_path.exists():
+            tickers_df = pd.read_csv(tickers_path).set_index("ticker")
+            if ticker in tickers_df.index:
+                details.update(tickers_df.loc[ticker].dropna().to_dict())
+
+        return details
+
+    def get_price_history(self, ticker: str, start: date | None = None) -> pd.DataFrame:
+        file_path = self._find_file(ticker)
+
+        if file_path.suffix == ".parquet":
+            history_df = pd.read_parquet(file_path)
+        else:
+            history_df = pd.read_csv(file_path, index_col=0)
+            # Keep only the date part, exports from yfinance carry UTC offsets
+            history_df.index = pd.to_datetime(history_df.index.astype(str).str[:10])
+
+        if history_df.index.tz is not None:
+            history_df.index = history_df.index.tz_localize(None)
+        history_df.index = history_df.index.normalize().rename("date")
+        history_df = history_df.sort_index()
+
+        if start is not None:
+            history_df = history_df[history_df.index >= pd.Timestamp(start)]
+        return history_df
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Generates reproducible geometric Brownian motion prices for any ticker.
+
+    Drift, volatility and inception date are drawn per ticker from a generator
+    seeded with the provider seed and the ticker name, so a ticker always gets
+    the same series regardless of which other tickers are requested.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self, seed: int = SYNTHETIC_SEED, start=SYNTHETIC_START, end=SYNTHETIC_END
+    ):
+        self.seed = seed
+        self.sessions = pd.bdate_range(start, end, name="date")
+
+    def _rng(self, ticker: str) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+
+    def get_ticker_details(self, ticker: str) -> dict:
+        return {
+            "name": f"Synthetic {ticker}",
+            "currency": "EUR",
+            "shortName": ticker,
+        }
+
+    def get_price_history(self, ticker: str, start: date | None = None) -> pd.DataFrame:
+        rng = self._rng(ticker)
+        annual_drift = rng.uniform(0.02, 0.12)
+        annual_volatility = rng.uniform(0.10, 0.35)
+        # Stagger inception dates over the first fifth of the calendar
+        inception = rng.integers(0, len(self.sessions) // 5 + 1)
+
+        sessions = self.sessions[inception:]
+        daily_volatility = annual_volatility / np.sqrt(252)
+        log_returns = rng.normal(
+            annual_drift / 252 - daily_volatility**2 / 2,
+            daily_volatility,
+            size=len(sessions),
+        )
+        close = 100 * np.exp(np.cumsum(log_returns))
+
+        history_df = pd.DataFrame({"Close": close}, index=sessions)
+        if start is not None:
+            history_df = history_df[history_df.index >= pd.Timestamp(start)]
+        return history_df
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (YahooFinanceProvider, LocalFileProvider, SyntheticProvider)
+}
+
+
+@cache
+def get_provider(name: str = MARKET_DATA_PROVIDER) -> MarketDataProvider:
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Unknown market data provider '{name}', "
+            f"expected one of: {', '.join(PROVIDERS)}"
+        )
+
+    return PROVIDERS[name]()
@@ -1,46 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
 import pandas as pd
-import streamlit as st
-import yfinance as yf
 
+from portfolio_analyzer import metadata_store, panel_store, price_store
+from portfolio_analyzer.cache import SingleFlight, cached
+from portfolio_analyzer.config import (
+    MAX_DOWNLOAD_WORKERS,
+    PRICE_PANEL_DTYPE,
+    PRICE_STORE_MAX_AGE,
+    PROVIDER_FAILURE_BACKOFF,
+)
+from portfolio_analyzer.market_data_providers import get_provider
+from portfolio_analyzer.price_panel import PricePanel, build_price_panel
+from portfolio_analyzer.profiling import span, traced
+from portfolio_analyzer.returns_cube import ReturnsCube, build_returns_cube
+
+# Refreshes of the same history by concurrent panels and sessions
+_HISTORY_REFRESHES = SingleFlight()
 
-@st.cache_data
+
+@traced("data")
+@cached(ttl=timedelta(days=1), backoff=PROVIDER_FAILURE_BACKOFF)
 def get_ticker_details(ticker):
-    data = yf.Ticker(ticker).get_info()
+    provider = get_provider()
+    if not provider.persistent:
+        return provider.get_ticker_details(ticker)
 
-    if "longName" not in data.keys():
-        raise ValueError(f"Ticker '{ticker}' doesn't exist.")
+    details = metadata_store.load_details(provider.name, ticker)
+    if details is None:
+        details = provider.get_ticker_details(ticker)
+        metadata_store.save_details(provider.name, ticker, details)
+    return details
 
-    return {
-        "name": data["longName"],
-        "currency": data["currency"],
-        "shortName": data["shortName"],
-    }
 
+def resolve_tickers(tickers: list[str]) -> tuple[dict[str, dict], dict[str, Exception]]:
+    """Details of all `tickers`, looked up concurrently.
 
-@st.cache_data
-def get_price_history(ticker: str) -> pd.DataFrame:
-    yticker = yf.Ticker(ticker)
+    Returns the details of the tickers that were resolved and the error of
+    each one that was not, a bad ticker doesn't stop the others.
+    """
+
+    def resolve(ticker):
+        try:
+            return get_ticker_details(ticker), None
+        except Exception as e:
+            return None, e
+
+    max_workers = max(1, min(MAX_DOWNLOAD_WORKERS, len(tickers)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(tickers, executor.map(resolve, tickers)))
+
+    details = {ticker: result for ticker, (result, _) in results.items() if result}
+    errors = {ticker: error for ticker, (_, error) in results.items() if error}
+    return details, errors
+
+
+def refresh_price_history(ticker: str) -> pd.DataFrame:
+    """Returns the stored history of `ticker`, fetching only the bars after the
+    last stored date from the provider. Concurrent refreshes of a ticker share
+    one fetch."""
+    provider = get_provider()
+    with span("refresh_price_history", "provider", ticker=ticker):
+        history_df, _ = _HISTORY_REFRESHES.do(
+            (provider.name, ticker), _refresh_price_history, provider, ticker
+        )
+    return history_df
+
+
+def _refresh_price_history(provider, ticker: str) -> pd.DataFrame:
+    if not provider.persistent:
+        return provider.get_price_history(ticker)
+
+    stored_df = price_store.load_history(provider.name, ticker)
+
+    if stored_df is None or stored_df.empty:
+        history_df = provider.get_price_history(ticker)
+    elif price_store.is_fresh(provider.name, ticker):
+        return stored_df
+    else:
+        # Start at the last stored bar so the overlap can be checked
+        delta_df = provider.get_price_history(ticker, start=stored_df.index[-1].date())
+        if delta_df.empty:
+            price_store.touch_history(provider.name, ticker)
+            return stored_df
+
+        history_df = price_store.merge_history(stored_df, delta_df)
+        if history_df is None:
+            history_df = provider.get_price_history(ticker)
 
-    history_df = yticker.history(period="max", interval="1d")
+    if not history_df.empty:
+        price_store.save_history(provider.name, ticker, history_df)
     return history_df
 
 
-@st.cache_data
+def load_price_histories(tickers: list[str]) -> dict[str, pd.DataFrame]:
+    provider = get_provider()
+    if not provider.persistent:
+        return provider.get_price_histories(tickers)
+
+    max_workers = max(1, min(MAX_DOWNLOAD_WORKERS, len(tickers)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(tickers, executor.map(refresh_price_history, tickers)))
+
+
+@traced("data")
+@cached(ttl=PRICE_STORE_MAX_AGE, backoff=PROVIDER_FAILURE_BACKOFF)
+def get_price_history(ticker: str) -> pd.DataFrame:
+    return refresh_price_history(ticker)
+
+
+@traced("data")
+@cached(ttl=PRICE_STORE_MAX_AGE, backoff=PROVIDER_FAILURE_BACKOFF)
+def get_price_panel(tickers: list[str], dtype: str = PRICE_PANEL_DTYPE) -> PricePanel:
+    """Price panel of `tickers`, mapped from the panel store so that all
+    sessions and server processes share one copy."""
+    key = panel_store.panel_key(get_provider().name, tickers, dtype)
+    panel = panel_store.load_panel(key)
+    if panel is not None:
+        return panel
+
+    with span("load_price_histories", "provider", tickers=len(tickers)):
+        histories = load_price_histories(tickers)
+    closes = {ticker: history["Close"] for ticker, history in histories.items()}
+
+    with span("build_price_panel", "data"):
+        return panel_store.save_panel(key, build_price_panel(closes, dtype=dtype))
+
+
 def get_prices_df(tickers: list[str]) -> pd.DataFrame:
-    prices_df = pd.DataFrame()
-    for ticker in tickers:
-        history = (
-            get_price_history(ticker)["Close"]
-            .to_frame()
-            .reset_index(drop=False)
-            .rename(columns={"Date": "date", "Close": "close"})
-        )
+    return get_price_panel(tickers).to_frame()
+
+
+@traced("data")
+@cached
+def load_returns_cube(
+    tickers: tuple[str, ...], allocation: tuple[float, ...], as_of: date
+) -> ReturnsCube:
+    """`as_of` is the last price date, a panel with new prices builds a new
+    cube."""
+    return build_returns_cube(
+        get_price_panel(list(tickers)), [weight / 100 for weight in allocation]
+    )
+
+
+def get_price_as_of(tickers: list[str]) -> date:
+    """Last price date of `tickers`, for the keys of cached results derived
+    from their prices, so that a price update computes them again."""
+    return get_price_panel(tickers).dates[-1].date()
 
-        history["date"] = history["date"].dt.tz_convert(None)
-        history = history.resample("D", on="date").last()
 
-        prices_df = prices_df.merge(
-            history["close"], left_index=True, right_index=True, how="outer"
-        ).rename(columns={"close": ticker})
+def get_returns_cube(portfolio_df: pd.DataFrame) -> ReturnsCube:
+    """The returns of a portfolio shared by all pages, built once per
+    allocation and price update."""
+    tickers = portfolio_df["ticker"].tolist()
 
-    return prices_df
+    return load_returns_cube(
+        tuple(tickers),
+        tuple(portfolio_df["allocation"].tolist()),
+        get_price_as_of(tickers),
+    )
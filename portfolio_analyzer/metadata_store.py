@@ -0,0 +1,35 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from portfolio_analyzer.config import METADATA_STORE_MAX_AGE, METADATA_STORE_PATH
+
+
+def _details_path(provider: str, ticker: str) -> Path:
+    return METADATA_STORE_PATH / provider / f"{ticker.replace(os.sep, '_')}.json"
+
+
+def load_details(provider: str, ticker: str) -> dict | None:
+    """Stored details of `ticker`, or None when missing or older than the
+    metadata store age."""
+    path = _details_path(provider, ticker)
+    if not path.exists():
+        return None
+
+    modified_at = datetime.fromtimestamp(path.stat().st_mtime)
+    if datetime.now() - modified_at >= METADATA_STORE_MAX_AGE:
+        return None
+
+    return json.loads(path.read_text())
+
+
+def save_details(provider: str, ticker: str, details: dict) -> None:
+    path = _details_path(provider, ticker)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write next to the target and swap, so readers never see a partial file
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(details))
+    os.replace(tmp_path, path)
@@ -1,17 +1,28 @@
 import math
+from dataclasses import dataclass
 from datetime import datetime
+from statistics import NormalDist
 
+import numpy as np
 import pandas as pd
-import streamlit as st
-from scipy.stats import norm
 
+from portfolio_analyzer.price_panel import PricePanel
+from portfolio_analyzer.profiling import traced
 
+
+@traced("metrics")
 def compute_portfolio_growth(
-    prices_df: pd.DataFrame, portfolio_df: pd.DataFrame, normalize_value: int = 1
+    prices: PricePanel | pd.DataFrame,
+    portfolio_df: pd.DataFrame,
+    normalize_value: int = 1,
 ) -> pd.DataFrame:
     allocation = portfolio_df.set_index("ticker")["allocation"] / 100
 
-    growth_df = prices_df.dropna(how="any")
+    if isinstance(prices, PricePanel):
+        # The panel knows where all assets have prices, no need to scan for NaN
+        growth_df = prices.common_frame()
+    else:
+        growth_df = prices.dropna(how="any")
 
     # Calculate asset growth
     growth_df = growth_df.div(growth_df.iloc[0])
@@ -23,10 +34,18 @@ def compute_portfolio_growth(
     return growth_df
 
 
+@traced("metrics")
 def calculate_return_rates(
     value_series: pd.Series, current_year: int = datetime.now().year
 ) -> pd.DataFrame:
-    return_rates_df = (value_series.pct_change().dropna() * 100).to_frame(name="return")
+    return label_return_rates(value_series.pct_change().dropna(), current_year)
+
+
+def label_return_rates(
+    return_series: pd.Series, current_year: int = datetime.now().year
+) -> pd.DataFrame:
+    """Returns of past years in %, with their sign."""
+    return_rates_df = (return_series * 100).to_frame(name="return")
 
     return_rates_df = return_rates_df[return_rates_df.index.year < current_year]
 
@@ -37,13 +56,17 @@ def calculate_return_rates(
     return return_rates_df
 
 
+@traced("metrics")
 def bin_series(
     series: pd.Series,
     bin_by: int,
     label_suffix: str = "",
     sign_threshold: float = 0,
     cutoff_bins: bool = True,
+    weights: np.ndarray | None = None,
 ) -> pd.DataFrame:
+    """Counts of `series` per bin of `bin_by`, or sums of the `weights` of its
+    values (e.g. histogram counts at the bin values)."""
     min_value = int(series.min() / bin_by - 1) * bin_by
     max_value = int(series.max() / bin_by + 1) * bin_by
 
@@ -51,13 +74,18 @@ def bin_series(
 
     bins = list(range(-bin_region, bin_region + bin_by, bin_by))
 
-    bins_df = (
-        pd.cut(series, bins=bins, labels=bins[:-1])
-        .value_counts()
-        .sort_index()
-        .to_frame()
-        .reset_index(names="bin_left")
-    )
+    binned = pd.cut(series, bins=bins, labels=bins[:-1])
+    if weights is None:
+        counts = binned.value_counts()
+    else:
+        counts = (
+            pd.Series(weights, index=series.index)
+            .groupby(binned, observed=False)
+            .sum()
+            .rename("count")
+        )
+
+    bins_df = counts.sort_index().to_frame().reset_index(names="bin_left")
 
     bins_df["bin_left"] = bins_df["bin_left"].astype(int)
     if cutoff_bins:
@@ -78,6 +106,32 @@ def bin_series(
     return bins_df
 
 
+@traced("metrics")
+def compute_return_distribution(
+    return_series: pd.Series, bin_width: float = 0.1
+) -> pd.DataFrame:
+    """Histogram of `return_series` (in %) next to the expected frequencies of
+    a normal distribution with the same mean and standard deviation."""
+    # Imported on use, scipy.stats takes longer to import than the whole core
+    from scipy.stats import norm
+
+    returns = return_series * 100
+    bin_region = returns.quantile(0.999)
+    bins = np.arange(-bin_region, bin_region, bin_width)
+
+    counts, _ = np.histogram(returns, bins=bins)
+    normal_probabilities = np.diff(norm.cdf(bins, returns.mean(), returns.std()))
+
+    return pd.DataFrame(
+        {
+            "return": (bins[:-1] + bins[1:]) / 2,
+            "frequency": counts / counts.sum(),
+            "normal_frequency": normal_probabilities / normal_probabilities.sum(),
+        }
+    )
+
+
+@traced("metrics")
 def compute_excess_returns(
     return_series: pd.Series,
     interest_rate_series: pd.Series,
@@ -105,6 +159,7 @@ def calculate_arr(return_series: pd.Series) -> float:
     return ((1 + return_series.div(100)).prod() ** (1 / n_years) - 1) * 100
 
 
+@traced("metrics")
 def compute_drawdown_df(growth_series: pd.Series) -> pd.DataFrame:
     drawdown_df = growth_series.to_frame("growth")
 
@@ -123,7 +178,154 @@ def compute_drawdown_df(growth_series: pd.Series) -> pd.DataFrame:
 def compute_value_at_risk(
     return_series: pd.Series, confidence_level: float = 0.95, scale: int = 1
 ) -> float:
-    z_score = norm.ppf(confidence_level)
+    z_score = NormalDist().inv_cdf(confidence_level)
     return (
         scale * return_series.mean() - math.sqrt(scale) * z_score * return_series.std()
     ) * 100
+
+
+@dataclass
+class PortfolioEvaluation:
+    """Metrics of several allocations of the same assets, one entry (or
+    column of `growth`) per allocation, defined as on the Returns and Risks
+    pages."""
+
+    dates: pd.DatetimeIndex
+    # (n_dates, n_portfolios)
+    growth: np.ndarray
+    # Annualized return rate over past calendar years, in %
+    arr: np.ndarray
+    # Annualized standard deviation of daily returns, in %
+    volatility: np.ndarray
+    # Mean over standard deviation of past monthly excess returns
+    sharpe_ratio: np.ndarray
+    # Deepest daily drawdown, in %
+    max_drawdown: np.ndarray
+    # Monthly variance-covariance VaR, in %
+    value_at_risk: np.ndarray
+
+
+def period_end_rows(dates: pd.DatetimeIndex, freq: str) -> pd.Series:
+    """Row of the last session of every period, labeled by period end."""
+    return (
+        pd.Series(np.arange(len(dates)), index=dates)
+        .resample(freq)
+        .last()
+        .dropna()
+        .astype(int)
+    )
+
+
+def _period_returns(
+    growth: np.ndarray, dates: pd.DatetimeIndex, freq: str, current_year: int
+) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """Period-over-period returns (in %) of completed years, as in
+    `calculate_return_rates`."""
+    rows = period_end_rows(dates, freq)
+    period_values = growth[rows.to_numpy()]
+    returns = (period_values[1:] / period_values[:-1] - 1) * 100
+
+    period_dates = rows.index[1:]
+    past = period_dates.year < current_year
+    return period_dates[past], returns[past]
+
+
+@traced("metrics")
+def evaluate_portfolios(
+    prices: PricePanel | pd.DataFrame,
+    weights: np.ndarray,
+    risk_free_rate_series: pd.Series | None = None,
+    confidence_level: float = 0.95,
+    normalize_value: int = 1,
+    current_year: int = datetime.now().year,
+) -> PortfolioEvaluation:
+    """Evaluates a (n_portfolios, n_assets) matrix of allocations (fractions
+    summing to 1, in the column order of `prices`) in one pass.
+
+    Asset prices are normalized once, the growth of every allocation is then a
+    single matrix product. `risk_free_rate_series` holds monthly rates in %
+    indexed by month end, as loaded by `load_risk_free_rates`.
+    """
+    if isinstance(prices, PricePanel):
+        rows = prices.common_range
+        dates = prices.dates[rows]
+        asset_values = prices.values[rows]
+    else:
+        prices = prices.dropna(how="any")
+        dates = pd.DatetimeIndex(prices.index)
+        asset_values = prices.to_numpy(dtype=np.float64)
+
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if weights.shape[1] != asset_values.shape[1]:
+        raise ValueError(
+            f"Expected weights for {asset_values.shape[1]} assets, "
+            f"got {weights.shape[1]}."
+        )
+
+    asset_growth = asset_values / asset_values[0]
+    return evaluate_growth(
+        dates,
+        asset_growth @ weights.T,
+        risk_free_rate_series=risk_free_rate_series,
+        confidence_level=confidence_level,
+        normalize_value=normalize_value,
+        current_year=current_year,
+    )
+
+
+@traced("metrics")
+def evaluate_growth(
+    dates: pd.DatetimeIndex,
+    growth: np.ndarray,
+    risk_free_rate_series: pd.Series | None = None,
+    confidence_level: float = 0.95,
+    normalize_value: int = 1,
+    current_year: int = datetime.now().year,
+) -> PortfolioEvaluation:
+    """Metrics of a (n_dates, n_portfolios) block of daily portfolio values,
+    e.g. from `evaluate_portfolios` or a rebalancing backtest."""
+    growth = np.asarray(growth, dtype=np.float64)
+    if growth.ndim == 1:
+        growth = growth[:, None]
+    growth = growth / growth[0]
+
+    daily_returns = growth[1:] / growth[:-1] - 1
+    volatility = daily_returns.std(axis=0, ddof=1) * np.sqrt(252) * 100
+
+    max_drawdown = (growth / np.maximum.accumulate(growth, axis=0) - 1).min(
+        axis=0
+    ) * 100
+
+    _, annual_returns = _period_returns(growth, dates, "YE", current_year)
+    # Histories without a completed year have no annualized return
+    num_years = len(annual_returns) or np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        arr = (np.prod(1 + annual_returns / 100, axis=0) ** (1 / num_years) - 1) * 100
+
+    # The Risks page keeps the running year in its VaR, the Sharpe ratio doesn't
+    _, monthly_returns = _period_returns(growth, dates, "ME", current_year + 1)
+    value_at_risk = monthly_returns.mean(axis=0) - NormalDist().inv_cdf(
+        confidence_level
+    ) * monthly_returns.std(axis=0, ddof=1)
+
+    month_ends, past_monthly_returns = _period_returns(
+        growth, dates, "ME", current_year
+    )
+    if risk_free_rate_series is None:
+        excess_returns = past_monthly_returns
+    else:
+        risk_free_rates = risk_free_rate_series.reindex(month_ends).to_numpy()
+        excess_returns = past_monthly_returns - risk_free_rates[:, None]
+    sharpe_ratio = np.nanmean(excess_returns, axis=0) / np.nanstd(
+        excess_returns, axis=0, ddof=1
+    )
+
+    return PortfolioEvaluation(
+        dates=dates,
+        growth=growth * normalize_value,
+        arr=arr,
+        volatility=volatility,
+        sharpe_ratio=sharpe_ratio,
+        max_drawdown=max_drawdown,
+        value_at_risk=value_at_risk,
+    )
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pandas as pd
+
+from portfolio_analyzer.cache import cached
+from portfolio_analyzer.forecast_service import get_return_model
+from portfolio_analyzer.interest_data_service import load_risk_free_rates
+from portfolio_analyzer.market_data_service import get_price_as_of, get_price_panel
+from portfolio_analyzer.optimizer import OptimizedPortfolio, PortfolioOptimizer
+from portfolio_analyzer.profiling import traced
+
+
+def get_average_risk_free_rate(tickers: list[str]) -> float:
+    """Average annual risk-free rate (in %) since all assets have prices."""
+    return _load_average_risk_free_rate(tickers, get_price_as_of(tickers))
+
+
+# Cached with the last price date of the assets, `as_of`, so that the results
+# below follow the price updates
+@cached
+def _load_average_risk_free_rate(tickers: list[str], as_of: date) -> float:
+    price_panel = get_price_panel(tickers)
+    start_date = price_panel.dates[price_panel.common_range.start]
+
+    _, annual_risk_free_rates_df = load_risk_free_rates()
+    return annual_risk_free_rates_df.loc[start_date:, "rate"].mean()
+
+
+@traced("optimizer")
+def get_optimized_portfolios(
+    tickers: list[str], max_allocation: float
+) -> tuple[OptimizedPortfolio, OptimizedPortfolio, pd.DataFrame]:
+    """Returns the minimum variance and maximum Sharpe ratio portfolios and
+    the efficient frontier, with at most `max_allocation` (in %) per asset."""
+    return _load_optimized_portfolios(tickers, max_allocation, get_price_as_of(tickers))
+
+
+@cached
+def _load_optimized_portfolios(
+    tickers: list[str], max_allocation: float, as_of: date
+) -> tuple[OptimizedPortfolio, OptimizedPortfolio, pd.DataFrame]:
+    optimizer = PortfolioOptimizer(
+        get_return_model(tickers),
+        risk_free_rate=get_average_risk_free_rate(tickers),
+        upper_bounds=max_allocation / 100,
+    )
+
+    return (
+        optimizer.minimum_variance(),
+        optimizer.maximum_sharpe(),
+        optimizer.efficient_frontier(),
+    )
+
+
+def evaluate_portfolio(portfolio_df: pd.DataFrame) -> OptimizedPortfolio:
+    return _evaluate_portfolio(
+        portfolio_df, get_price_as_of(portfolio_df["ticker"].tolist())
+    )
+
+
+@cached
+def _evaluate_portfolio(portfolio_df: pd.DataFrame, as_of: date) -> OptimizedPortfolio:
+    tickers = portfolio_df["ticker"].tolist()
+    optimizer = PortfolioOptimizer(
+        get_return_model(tickers),
+        risk_free_rate=get_average_risk_free_rate(tickers),
+    )
+    return optimizer.evaluate(portfolio_df["allocation"].to_numpy() / 100)
@@ -0,0 +1,352 @@
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.simulation import ReturnModel
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+@dataclass
+class OptimizedPortfolio:
+    weights: pd.Series
+    # Annualized, in %
+    expected_return: float
+    volatility: float
+    sharpe_ratio: float
+
+
+def _bounds(num_assets: int, lower, upper) -> tuple[np.ndarray, np.ndarray]:
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), num_assets)
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), num_assets)
+
+    if (lower > upper).any() or lower.sum() > 1 or upper.sum() < 1:
+        raise ValueError(
+            "No allocation summing to 100% satisfies the per-asset bounds."
+        )
+    return lower, upper
+
+
+def project_to_bounded_simplex(
+    v: np.ndarray, lower: np.ndarray, upper: np.ndarray
+) -> np.ndarray:
+    """Euclidean projection of `v` onto {w : sum(w) = 1, lower <= w <= upper}.
+
+    The projection is clip(v - tau, lower, upper) for the shift tau making it
+    sum to 1. That sum is piecewise linear in tau with breakpoints at
+    v - upper and v - lower, so it is evaluated at every breakpoint with
+    sorted cumulative sums and tau is interpolated on the right segment.
+    """
+    upper_breaks = v - upper
+    lower_breaks = v - lower
+    taus = np.sort(np.concatenate([upper_breaks, lower_breaks]))
+
+    # Assets with upper_break >= tau sit on their upper bound
+    upper_order = np.argsort(upper_breaks)
+    num_not_upper = np.searchsorted(upper_breaks[upper_order], taus, side="left")
+    upper_sum = np.concatenate([[0], np.cumsum(upper[upper_order])])
+    upper_v_sum = np.concatenate([[0], np.cumsum(v[upper_order])])
+    at_upper = upper_sum[-1] - upper_sum[num_not_upper]
+    at_upper_v = upper_v_sum[-1] - upper_v_sum[num_not_upper]
+
+    # Assets with lower_break < tau sit on their lower bound
+    lower_order = np.argsort(lower_breaks)
+    num_lower = np.searchsorted(lower_breaks[lower_order], taus, side="left")
+    at_lower = np.concatenate([[0], np.cumsum(lower[lower_order])])[num_lower]
+    at_lower_v = np.concatenate([[0], np.cumsum(v[lower_order])])[num_lower]
+
+    # The others contribute v - tau
+    num_free = num_not_upper - num_lower
+    free_v = v.sum() - at_upper_v - at_lower_v
+    sums = at_upper + at_lower + free_v - num_free * taus
+
+    tau = np.interp(1.0, sums[::-1], taus[::-1])
+    return np.clip(v - tau, lower, upper)
+
+
+def _duality_gap(
+    weights: np.ndarray, gradient: np.ndarray, lower: np.ndarray, upper: np.ndarray
+) -> float:
+    """Upper bound of the objective excess of `weights`, gradient'(w - s) for
+    the vertex s of the bounded simplex minimizing gradient's (Frank-Wolfe).
+
+    That vertex fills the assets of lowest gradient up to their upper bound,
+    the others staying at their lower bound.
+    """
+    order = np.argsort(gradient)
+    room = (upper - lower)[order]
+    filled = np.minimum(room, np.maximum(1 - lower.sum() - np.cumsum(room) + room, 0))
+    vertex = lower.copy()
+    vertex[order] += filled
+    return gradient @ (weights - vertex)
+
+
+def _is_solution(
+    cov: np.ndarray,
+    mean: np.ndarray,
+    risk_aversion_inverse: float,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    weights: np.ndarray,
+    tolerance: float,
+) -> bool:
+    """Whether the duality gap of `weights` is below `tolerance` relative to
+    the size of both terms of the objective."""
+    cov_weights = cov @ weights
+    gradient = 2 * cov_weights - risk_aversion_inverse * mean
+    scale = weights @ cov_weights + risk_aversion_inverse * abs(mean @ weights)
+    return _duality_gap(weights, gradient, lower, upper) <= tolerance * scale
+
+
+def _solve_free_assets(
+    cov: np.ndarray,
+    mean: np.ndarray,
+    risk_aversion_inverse: float,
+    weights: np.ndarray,
+    free: np.ndarray,
+) -> np.ndarray | None:
+    """Exact minimizer over the `free` assets, the others held at their
+    weights, subject to the budget only. None when their covariance is
+    singular."""
+    fixed = ~free
+    target = (
+        risk_aversion_inverse * mean[free]
+        - 2 * cov[np.ix_(free, fixed)] @ (weights[fixed])
+    )
+    try:
+        # Stationarity 2 C w = target + multiplier, solved for both terms
+        solutions = np.linalg.solve(
+            2 * cov[np.ix_(free, free)],
+            np.column_stack([target, np.ones(free.sum())]),
+        )
+    except np.linalg.LinAlgError:
+        return None
+
+    budget = 1 - weights[fixed].sum()
+    multiplier = (budget - solutions[:, 0].sum()) / solutions[:, 1].sum()
+    solution = weights.copy()
+    solution[free] = solutions[:, 0] + multiplier * solutions[:, 1]
+    return solution
+
+
+def _solve(
+    cov: np.ndarray,
+    mean: np.ndarray,
+    risk_aversion_inverse: float,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    start: np.ndarray,
+    step: float,
+    max_iterations: int = 1_000,
+    tolerance: float = 1e-7,
+    check_every: int = 5,
+) -> np.ndarray:
+    """Minimizes w'Cw - t * mean'w over the bounded simplex with accelerated
+    projected gradient descent (FISTA), warm-started at `start`.
+
+    The momentum restarts whenever it points against the last step, which
+    keeps the descent from oscillating around the optimum. Every
+    `check_every` iterations it stops once the duality gap is small enough.
+    The descent finds which assets sit on a bound long before it converges
+    on ill-conditioned covariances, so once they stop changing the weights of
+    the others are solved exactly and kept if that is the solution.
+    """
+    weights = start
+    momentum_point = start
+    momentum = 1.0
+    problem = (cov, mean, risk_aversion_inverse, lower, upper)
+    free = tried_free = None
+
+    for iteration in range(1, max_iterations + 1):
+        gradient = 2 * cov @ momentum_point - risk_aversion_inverse * mean
+        next_weights = project_to_bounded_simplex(
+            momentum_point - step * gradient, lower, upper
+        )
+
+        if (momentum_point - next_weights) @ (next_weights - weights) > 0:
+            momentum = 1.0
+        next_momentum = (1 + np.sqrt(1 + 4 * momentum**2)) / 2
+        momentum_point = next_weights + (momentum - 1) / next_momentum * (
+            next_weights - weights
+        )
+        weights, momentum = next_weights, next_momentum
+
+        if iteration % check_every:
+            continue
+        if _is_solution(*problem, weights, tolerance):
+            break
+
+        previous_free, free = free, (weights > lower) & (weights < upper)
+        if (
+            free.any()
+            and np.array_equal(free, previous_free)
+            and not np.array_equal(free, tried_free)
+        ):
+            tried_free = free
+            solution = _solve_free_assets(
+                cov, mean, risk_aversion_inverse, weights, free
+            )
+            if (
+                solution is not None
+                and (solution >= lower).all()
+                and (solution <= upper).all()
+                and _is_solution(*problem, solution, tolerance)
+            ):
+                return solution
+
+    return weights
+
+
+class PortfolioOptimizer:
+    """Mean-variance optimizer over a precomputed return model.
+
+    Portfolios are long-only, fully invested and may be bounded per asset.
+    Means and covariances are annualized once, every candidate only costs
+    matrix-vector products.
+    """
+
+    def __init__(
+        self,
+        model: ReturnModel,
+        risk_free_rate: float = 0.0,
+        lower_bounds=0.0,
+        upper_bounds=1.0,
+    ):
+        """`risk_free_rate` is the annual rate in %."""
+        self.tickers = model.tickers
+        self.mean = model.mean * TRADING_DAYS_PER_YEAR
+        self.cov = model.cov * TRADING_DAYS_PER_YEAR
+        self.risk_free_rate = risk_free_rate / 100
+        self.lower, self.upper = _bounds(len(self.tickers), lower_bounds, upper_bounds)
+
+        # Gradient steps must stay below 1 / Lipschitz constant of 2 * cov
+        self._step = 1 / (2 * np.linalg.eigvalsh(self.cov)[-1] + 1e-12)
+        self._start = project_to_bounded_simplex(
+            np.full(len(self.tickers), 1 / len(self.tickers)), self.lower, self.upper
+        )
+        # Frontier sweeps by number of points, shared by the frontier and the
+        # maximum Sharpe ratio search
+        self._frontiers: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    def _portfolio(self, weights: np.ndarray) -> OptimizedPortfolio:
+        expected_return = weights @ self.mean
+        volatility = np.sqrt(max(weights @ self.cov @ weights, 0))
+
+        return OptimizedPortfolio(
+            weights=pd.Series(weights, index=self.tickers, name="weight"),
+            expected_return=expected_return * 100,
+            volatility=volatility * 100,
+            sharpe_ratio=(expected_return - self.risk_free_rate) / volatility
+            if volatility > 0
+            else np.nan,
+        )
+
+    def _solve(self, risk_aversion_inverse: float, start=None) -> np.ndarray:
+        return _solve(
+            self.cov,
+            self.mean,
+            risk_aversion_inverse,
+            self.lower,
+            self.upper,
+            self._start if start is None else start,
+            self._step,
+        )
+
+    def evaluate(self, weights) -> OptimizedPortfolio:
+        return self._portfolio(np.asarray(weights, dtype=np.float64))
+
+    @functools.cached_property
+    def _minimum_variance_weights(self) -> np.ndarray:
+        return self._solve(0.0)
+
+    def minimum_variance(self) -> OptimizedPortfolio:
+        return self._portfolio(self._minimum_variance_weights)
+
+    def _frontier_weights(self, num_points: int) -> tuple[np.ndarray, np.ndarray]:
+        if num_points in self._frontiers:
+            return self._frontiers[num_points]
+
+        # Trade-offs from pure variance minimization to (almost) pure return
+        # maximization, relative to the scale of the inputs
+        scale = 2 * np.trace(self.cov) / max(np.abs(self.mean).sum(), 1e-12)
+        trade_offs = np.concatenate(
+            [[0.0], scale * np.geomspace(1e-3, 1e3, num_points - 1)]
+        )
+
+        frontier = np.empty((num_points, len(self.tickers)))
+        weights = frontier[0] = self._minimum_variance_weights
+        for i, trade_off in enumerate(trade_offs[1:], start=1):
+            weights = self._solve(trade_off, start=weights)
+            frontier[i] = weights
+
+        self._frontiers[num_points] = trade_offs, frontier
+        return trade_offs, frontier
+
+    def efficient_frontier(self, num_points: int = 50) -> pd.DataFrame:
+        """One row per frontier portfolio, ordered by volatility, with its
+        expected return and volatility (in %), Sharpe ratio and weights."""
+        _, frontier = self._frontier_weights(num_points)
+
+        expected_returns = frontier @ self.mean
+        volatilities = np.sqrt(
+            np.maximum(np.einsum("pi,ij,pj->p", frontier, self.cov, frontier), 0)
+        )
+        frontier_df = pd.DataFrame(frontier, columns=self.tickers)
+        frontier_df.insert(0, "expected_return", expected_returns * 100)
+        frontier_df.insert(1, "volatility", volatilities * 100)
+        frontier_df.insert(
+            2,
+            "sharpe_ratio",
+            (expected_returns - self.risk_free_rate)
+            / np.where(volatilities > 0, volatilities, np.nan),
+        )
+
+        return (
+            frontier_df.drop_duplicates(subset=["expected_return", "volatility"])
+            .sort_values("volatility")
+            .reset_index(drop=True)
+        )
+
+    def maximum_sharpe(
+        self, num_points: int = 50, iterations: int = 12
+    ) -> OptimizedPortfolio:
+        """Locates the tangency portfolio on the frontier and refines it with
+        a golden-section search over the trade-off parameter (the Sharpe
+        ratio is unimodal along the frontier).
+
+        The frontier is the one of `efficient_frontier` with as many points,
+        solved once for both.
+        """
+        trade_offs, frontier = self._frontier_weights(num_points)
+        sharpe_ratios = [self._portfolio(weights).sharpe_ratio for weights in frontier]
+        best = int(np.nanargmax(sharpe_ratios))
+
+        def candidate(trade_off, start):
+            weights = self._solve(trade_off, start=start)
+            return weights, self._portfolio(weights).sharpe_ratio
+
+        low = trade_offs[max(best - 1, 0)]
+        high = trade_offs[min(best + 1, num_points - 1)]
+        golden = (np.sqrt(5) - 1) / 2
+        left, right = high - golden * (high - low), low + golden * (high - low)
+        left_candidate = candidate(left, frontier[best])
+        right_candidate = candidate(right, frontier[best])
+
+        for _ in range(iterations):
+            if left_candidate[1] >= right_candidate[1]:
+                high, right, right_candidate = right, left, left_candidate
+                left = high - golden * (high - low)
+                # Warm-started at the nearest solved candidate
+                left_candidate = candidate(left, right_candidate[0])
+            else:
+                low, left, left_candidate = left, right, right_candidate
+                right = low + golden * (high - low)
+                right_candidate = candidate(right, left_candidate[0])
+
+        best_weights, _ = max(
+            [left_candidate, right_candidate, (frontier[best], sharpe_ratios[best])],
+            key=lambda weights_sharpe: weights_sharpe[1],
+        )
+        return self._portfolio(best_weights)
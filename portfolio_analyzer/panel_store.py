@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.config import PRICE_PANEL_PATH, PRICE_STORE_MAX_AGE
+from portfolio_analyzer.price_panel import PricePanel
+
+_ARRAYS = ("values", "mask", "first_idx", "last_idx")
+# Unused versions and temporary files are removed once they are this old,
+# sparing those another process is still writing or has just stopped using
+_VERSION_GRACE_SECONDS = 60
+
+
+def panel_key(provider: str, tickers: list[str], dtype: str) -> str:
+    content = json.dumps([provider, list(tickers), str(np.dtype(dtype))])
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def _pointer_path(key: str) -> Path:
+    """File naming the current version directory of a panel, `<key>.<id>`."""
+    return PRICE_PANEL_PATH / f"{key}.current"
+
+
+def _is_fresh(path: Path) -> bool:
+    return time.time() - path.stat().st_mtime < PRICE_STORE_MAX_AGE.total_seconds()
+
+
+def load_panel(key: str) -> PricePanel | None:
+    """Maps a stored panel read-only, or returns None when it is missing or
+    older than the price store age.
+
+    The arrays are views over the page cache, every session and process
+    mapping the same panel shares one copy of it.
+    """
+    pointer = _pointer_path(key)
+    try:
+        if not _is_fresh(pointer):
+            return None
+
+        path = PRICE_PANEL_PATH / pointer.read_text()
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS
+        }
+        tickers = json.loads((path / "tickers.json").read_text())
+        dates = np.load(path / "dates.npy")
+    except OSError:
+        # Never stored, or a superseded version removed while it was read
+        return None
+
+    dates = pd.DatetimeIndex(dates.view("datetime64[ns]"), name="date")
+    return PricePanel(dates=dates, tickers=tickers, **arrays)
+
+
+def save_panel(key: str, panel: PricePanel) -> PricePanel:
+    """Stores `panel` and returns it mapped from the store.
+
+    Every save writes a new version directory and then publishes it by
+    replacing the pointer file, so a reader maps either the previous version
+    or the new one, complete.
+    """
+    PRICE_PANEL_PATH.mkdir(parents=True, exist_ok=True)
+    version = f"{key}.{uuid.uuid4().hex}"
+    path = PRICE_PANEL_PATH / version
+
+    path.mkdir()
+    for name in _ARRAYS:
+        np.save(path / f"{name}.npy", getattr(panel, name))
+    np.save(path / "dates.npy", panel.dates.as_unit("ns").asi8)
+    (path / "tickers.json").write_text(json.dumps(panel.tickers))
+
+    pointer = _pointer_path(key)
+    tmp_pointer = pointer.with_name(f"{version}.tmp")
+    tmp_pointer.write_text(version)
+    os.replace(tmp_pointer, pointer)
+
+    _remove_unused()
+    return load_panel(key) or panel
+
+
+def _remove_unused() -> None:
+    """Deletes what no reader needs any more: panels not saved again within
+    the price store age, versions replaced by a newer one and temporary
+    pointers of writers that died.
+
+    Everything younger than the grace period is kept, other processes may
+    still be writing or mapping it. Mappings of a deleted version stay valid
+    until they are dropped, and a reader losing its version while loading it
+    gets None and rebuilds.
+    """
+    now = time.time()
+    expired_before = now - PRICE_STORE_MAX_AGE.total_seconds()
+    unused_before = now - _VERSION_GRACE_SECONDS
+
+    current_versions = set()
+    for pointer in PRICE_PANEL_PATH.glob("*.current"):
+        try:
+            if pointer.stat().st_mtime < expired_before:
+                pointer.unlink()
+            else:
+                current_versions.add(pointer.read_text())
+        except OSError:
+            # Replaced or removed by another writer meanwhile
+            continue
+
+    for path in PRICE_PANEL_PATH.iterdir():
+        try:
+            if path.name in current_versions or path.suffix == ".current":
+                continue
+            if path.stat().st_mtime >= unused_before:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.suffix == ".tmp":
+                path.unlink()
+        except OSError:
+            continue
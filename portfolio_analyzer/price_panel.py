@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class PricePanel:
+    """Close prices of several assets indexed on the union of their trading
+    sessions.
+
+    `values` is a C-contiguous (n_dates, n_tickers) block. Inside an asset's
+    live range (`first_idx` to `last_idx`) prices are forward filled over
+    sessions the asset did not trade, outside of it they are NaN. `mask` marks
+    the sessions with an actual observation.
+
+    Arrays are read-only, a panel is shared by every session using it (and
+    may be mapped from the panel store). Frames are views over them.
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: list[str]
+    values: np.ndarray
+    mask: np.ndarray
+    first_idx: np.ndarray
+    last_idx: np.ndarray
+
+    @property
+    def inception_dates(self) -> pd.Series:
+        return pd.Series(self.dates[self.first_idx], index=self.tickers)
+
+    @property
+    def last_dates(self) -> pd.Series:
+        return pd.Series(self.dates[self.last_idx], index=self.tickers)
+
+    @property
+    def common_range(self) -> slice:
+        """Rows where every asset has a price."""
+        return slice(int(self.first_idx.max()), int(self.last_idx.min()) + 1)
+
+    def select(self, tickers: list[str]) -> "PricePanel":
+        """Panel of some of the assets, on the same dates."""
+        positions = [self.tickers.index(ticker) for ticker in tickers]
+        return PricePanel(
+            dates=self.dates,
+            tickers=list(tickers),
+            values=self.values[:, positions],
+            mask=self.mask[:, positions],
+            first_idx=self.first_idx[positions],
+            last_idx=self.last_idx[positions],
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.values, index=self.dates, columns=self.tickers, copy=False
+        )
+
+    def common_frame(self) -> pd.DataFrame:
+        rows = self.common_range
+        return pd.DataFrame(
+            self.values[rows], index=self.dates[rows], columns=self.tickers, copy=False
+        )
+
+
+def build_price_panel(
+    closes: dict[str, pd.Series], dtype: str | np.dtype = np.float64
+) -> PricePanel:
+    """Builds a panel from per-ticker close series indexed by session date."""
+    prices_df = pd.concat(closes, axis=1).sort_index()
+
+    values = prices_df.to_numpy(dtype=dtype, copy=True)
+    mask = ~np.isnan(values)
+
+    missing = [
+        ticker for ticker, has_data in zip(closes, mask.any(axis=0)) if not has_data
+    ]
+    if missing:
+        raise ValueError(f"No price history for: {', '.join(missing)}")
+
+    n_dates = len(values)
+    first_idx = mask.argmax(axis=0)
+    last_idx = n_dates - 1 - mask[::-1].argmax(axis=0)
+
+    # Carry the last price over sessions where only other assets traded
+    rows = np.arange(n_dates)[:, None]
+    live = (rows >= first_idx) & (rows <= last_idx)
+    fill_idx = np.maximum.accumulate(np.where(mask, rows, 0), axis=0)
+    values = np.where(live, np.take_along_axis(values, fill_idx, axis=0), np.nan)
+
+    values = np.ascontiguousarray(values, dtype=dtype)
+    for array in (values, mask, first_idx, last_idx):
+        array.flags.writeable = False
+
+    return PricePanel(
+        dates=pd.DatetimeIndex(prices_df.index, name="date"),
+        tickers=list(closes),
+        values=values,
+        mask=mask,
+        first_idx=first_idx,
+        last_idx=last_idx,
+    )
@@ -0,0 +1,63 @@
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from portfolio_analyzer.config import PRICE_STORE_MAX_AGE, PRICE_STORE_PATH
+
+
+def _history_path(provider: str, ticker: str) -> Path:
+    return PRICE_STORE_PATH / provider / f"{ticker.replace(os.sep, '_')}.parquet"
+
+
+def load_history(provider: str, ticker: str) -> pd.DataFrame | None:
+    path = _history_path(provider, ticker)
+    if not path.exists():
+        return None
+
+    return pd.read_parquet(path)
+
+
+def save_history(provider: str, ticker: str, history_df: pd.DataFrame) -> None:
+    path = _history_path(provider, ticker)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write next to the target and swap, so readers never see a partial file.
+    # Unique per writer, other processes may be saving the same ticker
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    history_df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def touch_history(provider: str, ticker: str) -> None:
+    _history_path(provider, ticker).touch()
+
+
+def is_fresh(provider: str, ticker: str) -> bool:
+    path = _history_path(provider, ticker)
+    if not path.exists():
+        return False
+
+    modified_at = datetime.fromtimestamp(path.stat().st_mtime)
+    return datetime.now() - modified_at < PRICE_STORE_MAX_AGE
+
+
+def merge_history(
+    stored_df: pd.DataFrame, delta_df: pd.DataFrame, rtol: float = 1e-6
+) -> pd.DataFrame | None:
+    """Appends `delta_df` to `stored_df`.
+
+    `delta_df` is expected to start at the last stored bar. Returns None when
+    the overlapping close differs, which means the provider has re-adjusted the
+    series (dividend or split) and the whole history must be downloaded again.
+    """
+    overlap = delta_df.index.intersection(stored_df.index)
+    if len(overlap) > 0:
+        stored_close = stored_df.loc[overlap, "Close"]
+        delta_close = delta_df.loc[overlap, "Close"]
+        if not ((stored_close - delta_close).abs() <= rtol * stored_close.abs()).all():
+            return None
+
+    return pd.concat([stored_df[stored_df.index < delta_df.index[0]], delta_df])
@@ -0,0 +1,110 @@
+"""Timing spans around the stages of the app, recorded only when
+`PROFILING` is enabled.
+
+When it is disabled `traced` returns functions unchanged and `span` a shared
+no-op context, so instrumented code runs as if it were not. Recorded spans
+are kept in a bounded buffer, logged as JSON to the
+"portfolio_analyzer.profiling" logger at debug level and exportable as a
+Chrome trace (chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+from portfolio_analyzer.config import PROFILING, PROFILING_MAX_SPANS
+
+logger = logging.getLogger(__name__)
+
+clock = time.perf_counter_ns
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+@dataclass(frozen=True)
+class Span:
+    name: str
+    category: str
+    # On the `clock`, in nanoseconds
+    start: int
+    duration: int
+    thread_id: int
+    args: dict
+
+
+SPANS: deque[Span] = deque(maxlen=PROFILING_MAX_SPANS)
+
+
+@contextlib.contextmanager
+def _recorded_span(name: str, category: str, args: dict):
+    start = clock()
+    try:
+        yield
+    finally:
+        recorded = Span(
+            name, category, start, clock() - start, threading.get_ident(), args
+        )
+        SPANS.append(recorded)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(asdict(recorded), default=str))
+
+
+def span(name: str, category: str = "app", **args):
+    """Context manager timing the code it wraps as `name`."""
+    if not PROFILING:
+        return _NO_SPAN
+    return _recorded_span(name, category, args)
+
+
+def traced(category: str):
+    """Decorator timing every call of a function, named after it."""
+
+    def decorator(func):
+        if not PROFILING:
+            return func
+
+        name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _recorded_span(name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def spans_since(start: int, thread_id: int | None = None) -> list[Span]:
+    """Spans started after `start` (on the `clock`), of one thread only when
+    `thread_id` is given."""
+    return [
+        recorded
+        for recorded in list(SPANS)
+        if recorded.start >= start
+        and (thread_id is None or recorded.thread_id == thread_id)
+    ]
+
+
+def chrome_trace(spans: list[Span]) -> str:
+    """Spans in the Chrome trace event format, as complete events."""
+    events = [
+        {
+            "name": recorded.name,
+            "cat": recorded.category,
+            "ph": "X",
+            "ts": recorded.start / 1_000,
+            "dur": recorded.duration / 1_000,
+            "pid": os.getpid(),
+            "tid": recorded.thread_id,
+            "args": {key: str(value) for key, value in recorded.args.items()},
+        }
+        for recorded in spans
+    ]
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
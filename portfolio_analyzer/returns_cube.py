@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.metrics import period_end_rows
+from portfolio_analyzer.price_panel import PricePanel
+
+
+@dataclass(frozen=True)
+class ReturnsCube:
+    """Growth and returns of a portfolio and of its assets, daily and at
+    month and year ends, over the sessions where all assets have prices.
+
+    Growth frames have one column per ticker plus "portfolio_growth" and start
+    at 1, as `compute_portfolio_growth`. Return frames (as fractions) have one
+    column per ticker plus "portfolio_return", their first row is the return
+    over the first period.
+    """
+
+    tickers: list[str]
+    allocation: np.ndarray
+    daily_growth_df: pd.DataFrame
+    monthly_growth_df: pd.DataFrame
+    annual_growth_df: pd.DataFrame
+    daily_returns_df: pd.DataFrame
+    monthly_returns_df: pd.DataFrame
+    annual_returns_df: pd.DataFrame
+
+
+def _frames(
+    log_growth: np.ndarray, rows: np.ndarray, dates: pd.DatetimeIndex, columns
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Growth at `rows` and returns between consecutive `rows`."""
+    period_log_growth = log_growth[rows]
+    growth_df = pd.DataFrame(
+        np.exp(period_log_growth), index=dates, columns=[*columns, "portfolio_growth"]
+    )
+    returns_df = pd.DataFrame(
+        np.expm1(np.diff(period_log_growth, axis=0)),
+        index=dates[1:],
+        columns=[*columns, "portfolio_return"],
+    )
+    return growth_df, returns_df
+
+
+def build_returns_cube(panel: PricePanel, allocation: np.ndarray) -> ReturnsCube:
+    """`allocation` holds the fractions invested in each ticker of `panel`.
+
+    Cumulative log growth is computed once per asset and for the portfolio,
+    the returns at every resolution are then differences between period
+    boundaries.
+    """
+    allocation = np.asarray(allocation, dtype=np.float64)
+    rows = panel.common_range
+    dates = panel.dates[rows]
+    values = panel.values[rows].astype(np.float64, copy=False)
+
+    asset_growth = values / values[0]
+    log_growth = np.log(np.column_stack([asset_growth, asset_growth @ allocation]))
+    date_index = pd.DatetimeIndex(dates, name="date")
+
+    daily_growth_df, daily_returns_df = _frames(
+        log_growth, np.arange(len(dates)), date_index, panel.tickers
+    )
+
+    period_frames = []
+    for freq in ("ME", "YE"):
+        period_rows = period_end_rows(date_index, freq)
+        period_frames.append(
+            _frames(
+                log_growth,
+                period_rows.to_numpy(),
+                pd.DatetimeIndex(period_rows.index, name="date"),
+                panel.tickers,
+            )
+        )
+    (monthly_growth_df, monthly_returns_df), (annual_growth_df, annual_returns_df) = (
+        period_frames
+    )
+
+    return ReturnsCube(
+        tickers=list(panel.tickers),
+        allocation=allocation,
+        daily_growth_df=daily_growth_df,
+        monthly_growth_df=monthly_growth_df,
+        annual_growth_df=annual_growth_df,
+        daily_returns_df=daily_returns_df,
+        monthly_returns_df=monthly_returns_df,
+        annual_returns_df=annual_returns_df,
+    )
@@ -0,0 +1,223 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.profiling import traced
+
+VAR_METHODS = ("parametric", "cornish_fisher", "historical", "monte_carlo")
+# Tail levels averaged for the Cornish-Fisher expected shortfall
+TAIL_POINTS = 64
+# Monte Carlo draws are generated for this many values at a time at most
+CHUNK_ELEMENTS = 2**22
+
+
+@dataclass
+class RiskReport:
+    """Value at Risk and Expected Shortfall (CVaR) of one or several return
+    series, in % of return over the horizon (losses are negative).
+
+    Arrays are shaped (n_methods, n_horizons, n_confidence_levels,
+    n_portfolios), in the order of `methods`, `horizons` and
+    `confidence_levels`.
+    """
+
+    methods: tuple[str, ...]
+    horizons: tuple[int, ...]
+    confidence_levels: tuple[float, ...]
+    value_at_risk: np.ndarray
+    expected_shortfall: np.ndarray
+
+    def to_frame(self, portfolio: int = 0) -> pd.DataFrame:
+        """One row per method, horizon and confidence level."""
+        index = pd.MultiIndex.from_product(
+            [self.methods, self.horizons, self.confidence_levels],
+            names=["method", "horizon", "confidence_level"],
+        )
+        return pd.DataFrame(
+            {
+                "value_at_risk": self.value_at_risk[..., portfolio].ravel(),
+                "expected_shortfall": self.expected_shortfall[..., portfolio].ravel(),
+            },
+            index=index,
+        ).reset_index()
+
+
+def _sorted_tail(
+    sorted_returns: np.ndarray, tail_probabilities: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Quantiles and tail means at every level from returns sorted along the
+    first axis, shaped (n_levels, n_portfolios)."""
+    n = len(sorted_returns)
+
+    # Linear interpolation between order statistics, as np.quantile
+    positions = tail_probabilities * (n - 1)
+    below = np.floor(positions).astype(int)
+    above = np.minimum(below + 1, n - 1)
+    fraction = (positions - below)[:, None]
+    quantiles = (1 - fraction) * sorted_returns[below] + fraction * sorted_returns[
+        above
+    ]
+
+    # Mean of the worst returns, at least one
+    num_tail = np.maximum(np.floor(tail_probabilities * n).astype(int), 1)
+    cumsum = np.cumsum(sorted_returns, axis=0)
+    tail_means = cumsum[num_tail - 1] / num_tail[:, None]
+
+    return quantiles, tail_means
+
+
+def _overlapping_sums(returns: np.ndarray, horizon: int) -> np.ndarray:
+    cumsum = np.concatenate([np.zeros((1, returns.shape[1])), np.cumsum(returns, 0)])
+    return cumsum[horizon:] - cumsum[:-horizon]
+
+
+def _cornish_fisher_z(z: np.ndarray, skew: np.ndarray, kurtosis: np.ndarray):
+    """Quantile expansion of the standard normal `z` (n_levels, 1) for the
+    skewness and excess kurtosis (n_portfolios,) of the returns."""
+    return (
+        z
+        + (z**2 - 1) * skew / 6
+        + (z**3 - 3 * z) * kurtosis / 24
+        - (2 * z**3 - 5 * z) * skew**2 / 36
+    )
+
+
+@traced("risk")
+def compute_risk(
+    returns: pd.Series | pd.DataFrame | np.ndarray,
+    confidence_levels=(0.95, 0.99),
+    horizons=(1,),
+    methods=VAR_METHODS,
+    num_simulations: int = 10_000,
+    seed: int = 0,
+) -> RiskReport:
+    """VaR and Expected Shortfall of periodic returns (as fractions) with
+    several methods.
+
+    `returns` is one series or a (n_periods, n_portfolios) block, horizons are
+    counted in periods of the returns, whose returns add up over a horizon:
+    - parametric: normal distribution with the sample mean and deviation,
+      scaled with the square root of time as `compute_value_at_risk`
+    - cornish_fisher: normal quantiles corrected for the sample skewness and
+      excess kurtosis (scaled as those of a sum of independent returns)
+    - historical: empirical quantiles of the overlapping horizon returns, NaN
+      for horizons with fewer than two of them
+    - monte_carlo: empirical quantiles of `num_simulations` horizon returns
+      resampled from the history, the same draws for every portfolio
+
+    Moments and sorted returns are computed once and shared by all confidence
+    levels.
+    """
+    # Imported on use, scipy.stats takes longer to import than the whole core
+    from scipy.stats import norm
+
+    unknown = set(methods) - set(VAR_METHODS)
+    if unknown:
+        raise ValueError(
+            f"Unknown VaR method(s) {', '.join(sorted(unknown))}, "
+            f"expected some of: {', '.join(VAR_METHODS)}"
+        )
+
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    if np.isnan(returns).any():
+        raise ValueError("Returns must not contain missing values.")
+    if len(returns) < 2:
+        raise ValueError("At least two returns are needed to estimate risk.")
+
+    horizons = tuple(int(horizon) for horizon in horizons)
+    confidence_levels = tuple(float(level) for level in confidence_levels)
+    tail_probabilities = 1 - np.asarray(confidence_levels)
+    z = norm.ppf(tail_probabilities)[:, None]
+
+    mean = returns.mean(axis=0)
+    std = returns.std(axis=0, ddof=1)
+    standardized = (returns - mean) / np.where(std > 0, std, 1)
+    skew = (standardized**3).mean(axis=0)
+    kurtosis = (standardized**4).mean(axis=0) - 3
+
+    shape = (len(methods), len(horizons), len(confidence_levels), returns.shape[1])
+    value_at_risk = np.empty(shape)
+    expected_shortfall = np.empty(shape)
+
+    for m, method in enumerate(methods):
+        for h, horizon in enumerate(horizons):
+            horizon_mean = horizon * mean
+            horizon_std = np.sqrt(horizon) * std
+
+            if method == "parametric":
+                var = horizon_mean + z * horizon_std
+                es = horizon_mean - norm.pdf(z) / tail_probabilities[:, None] * (
+                    horizon_std
+                )
+
+            elif method == "cornish_fisher":
+                horizon_skew = skew / np.sqrt(horizon)
+                horizon_kurtosis = kurtosis / horizon
+                var = horizon_mean + horizon_std * _cornish_fisher_z(
+                    z, horizon_skew, horizon_kurtosis
+                )
+                # Average of the expanded quantiles over each tail
+                tail_z = norm.ppf(
+                    tail_probabilities[:, None]
+                    * (np.arange(TAIL_POINTS) + 0.5)
+                    / TAIL_POINTS
+                )
+                tail_cf_z = _cornish_fisher_z(
+                    tail_z[..., None], horizon_skew, horizon_kurtosis
+                )
+                es = horizon_mean + horizon_std * tail_cf_z.mean(axis=1)
+
+            elif method == "historical":
+                horizon_returns = _overlapping_sums(returns, horizon)
+                if len(horizon_returns) < 2:
+                    # Too short a history for this horizon, the others still
+                    # have their values
+                    var = es = np.nan
+                else:
+                    var, es = _sorted_tail(
+                        np.sort(horizon_returns, axis=0), tail_probabilities
+                    )
+
+            else:
+                var, es = _monte_carlo_tail(
+                    returns, horizon, tail_probabilities, num_simulations, seed
+                )
+
+            value_at_risk[m, h] = var
+            expected_shortfall[m, h] = es
+
+    return RiskReport(
+        methods=tuple(methods),
+        horizons=horizons,
+        confidence_levels=confidence_levels,
+        value_at_risk=value_at_risk * 100,
+        expected_shortfall=expected_shortfall * 100,
+    )
+
+
+def _monte_carlo_tail(
+    returns: np.ndarray,
+    horizon: int,
+    tail_probabilities: np.ndarray,
+    num_simulations: int,
+    seed: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(len(returns), size=(num_simulations, horizon))
+
+    num_portfolios = returns.shape[1]
+    quantiles = np.empty((len(tail_probabilities), num_portfolios))
+    tail_means = np.empty((len(tail_probabilities), num_portfolios))
+
+    chunk = max(1, CHUNK_ELEMENTS // (num_simulations * horizon))
+    for start in range(0, num_portfolios, chunk):
+        columns = slice(start, start + chunk)
+        horizon_returns = returns[:, columns][draws].sum(axis=1)
+        quantiles[:, columns], tail_means[:, columns] = _sorted_tail(
+            np.sort(horizon_returns, axis=0), tail_probabilities
+        )
+
+    return quantiles, tail_means
@@ -0,0 +1,142 @@
+"""Trailing-window versions of the portfolio metrics.
+
+Every function takes a daily series without gaps and returns a series of the
+same index with the metric over the `window` sessions ending on each date (NaN
+until the first window is complete). Window sums come from cumulative sums and window
+maxima from a monotonic deque, so each step costs O(1) whatever the window.
+"""
+
+from collections import deque
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+ROLLING_WINDOWS = {
+    "1 year": TRADING_DAYS_PER_YEAR,
+    "3 years": 3 * TRADING_DAYS_PER_YEAR,
+    "5 years": 5 * TRADING_DAYS_PER_YEAR,
+}
+
+
+def _check_window(window: int) -> None:
+    if window < 2:
+        raise ValueError(f"Rolling window must span at least 2 sessions, got {window}")
+
+
+def _rolling_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of every `window` consecutive values, aligned on the last one."""
+    sums = np.full(len(values), np.nan)
+    cumsum = np.concatenate([[0.0], np.cumsum(values)])
+    sums[window - 1 :] = cumsum[window:] - cumsum[:-window]
+    return sums
+
+
+def _rolling_mean_std(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    # Centering first keeps the sum of squares from cancelling out
+    offset = np.nanmean(values) if len(values) else 0.0
+    centered = values - offset
+
+    sums = _rolling_sums(centered, window)
+    squared_sums = _rolling_sums(centered**2, window)
+
+    mean = sums / window
+    variance = (squared_sums - sums * mean) / (window - 1)
+    return mean + offset, np.sqrt(np.maximum(variance, 0))
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Maximum of every `window` consecutive values, aligned on the last one.
+
+    The deque holds the positions of decreasing values still inside the
+    window, its head is the current maximum. Each position enters and leaves
+    it once.
+    """
+    maxima = np.full(len(values), np.nan)
+    candidates = deque()
+
+    for i, value in enumerate(values):
+        while candidates and values[candidates[-1]] <= value:
+            candidates.pop()
+        candidates.append(i)
+
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1:
+            maxima[i] = values[candidates[0]]
+
+    return maxima
+
+
+def rolling_volatility(return_series: pd.Series, window: int) -> pd.Series:
+    """Annualized standard deviation of daily returns, in %."""
+    _check_window(window)
+    _, std = _rolling_mean_std(return_series.to_numpy(dtype=np.float64), window)
+
+    return pd.Series(
+        std * np.sqrt(TRADING_DAYS_PER_YEAR) * 100,
+        index=return_series.index,
+        name="volatility",
+    )
+
+
+def rolling_sharpe_ratio(
+    return_series: pd.Series, risk_free_rate_series: pd.Series, window: int
+) -> pd.Series:
+    """Annualized Sharpe ratio of daily returns over daily risk-free rates
+    (both as fractions, on the same index)."""
+    _check_window(window)
+    excess_returns = (return_series - risk_free_rate_series).to_numpy(dtype=np.float64)
+    mean, std = _rolling_mean_std(excess_returns, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = mean / std * np.sqrt(TRADING_DAYS_PER_YEAR)
+    return pd.Series(sharpe_ratio, index=return_series.index, name="sharpe_ratio")
+
+
+def rolling_value_at_risk(
+    return_series: pd.Series,
+    window: int,
+    confidence_level: float = 0.95,
+    scale: int = 1,
+) -> pd.Series:
+    """Variance-covariance VaR of `scale` days, in %, as
+    `compute_value_at_risk`."""
+    _check_window(window)
+    mean, std = _rolling_mean_std(return_series.to_numpy(dtype=np.float64), window)
+    z_score = NormalDist().inv_cdf(confidence_level)
+
+    return pd.Series(
+        (scale * mean - np.sqrt(scale) * z_score * std) * 100,
+        index=return_series.index,
+        name="value_at_risk",
+    )
+
+
+def rolling_arr(growth_series: pd.Series, window: int) -> pd.Series:
+    """Annualized return rate between the start and the end of the window,
+    in %."""
+    _check_window(window)
+    growth = growth_series.to_numpy(dtype=np.float64)
+
+    arr = np.full(len(growth), np.nan)
+    if len(growth) >= window:
+        arr[window - 1 :] = (
+            (growth[window - 1 :] / growth[: len(growth) - window + 1])
+            ** (TRADING_DAYS_PER_YEAR / (window - 1))
+            - 1
+        ) * 100
+    return pd.Series(arr, index=growth_series.index, name="arr")
+
+
+def rolling_drawdown(growth_series: pd.Series, window: int) -> pd.Series:
+    """Decline from the highest value of the window, in %."""
+    _check_window(window)
+    growth = growth_series.to_numpy(dtype=np.float64)
+
+    return pd.Series(
+        (growth / rolling_max(growth, window) - 1) * 100,
+        index=growth_series.index,
+        name="drawdown",
+    )
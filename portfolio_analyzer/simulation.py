@@ -0,0 +1,711 @@
+import contextlib
+import multiprocessing
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analyzer.price_panel import PricePanel
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Number of float64 values generated per chunk, bounds the simulation memory
+CHUNK_ELEMENTS = 2**20
+# Per-step histograms span this many standard deviations around the mean
+HISTOGRAM_WIDTH_STDS = 8
+HISTOGRAM_BINS = 1024
+
+
+@dataclass
+class SimulationResult:
+    days: int
+    num_simulations: int
+    start_value: float
+    # Percentile bands of the portfolio value, one row per day (day 0 included)
+    bands_df: pd.DataFrame
+    # Mean, standard deviation and probability of loss of the value per day
+    mean: np.ndarray
+    std: np.ndarray
+    probability_of_loss: np.ndarray
+    sample_paths: np.ndarray
+    # Number of paths per bin of log growth, one row per day (day 1 first),
+    # the bins of a day start at `bin_start` and are `bin_width` wide
+    histogram: np.ndarray
+    bin_start: np.ndarray
+    bin_width: np.ndarray
+    # Every simulated value on the days listed in `keep_values_at`
+    kept_values: dict[int, np.ndarray]
+
+    @property
+    def terminal_values(self) -> np.ndarray | None:
+        return self.kept_values.get(self.days)
+
+    @property
+    def terminal_mean(self) -> float:
+        return float(self.mean[-1])
+
+    @property
+    def terminal_std(self) -> float:
+        return float(self.std[-1])
+
+    @property
+    def terminal_probability_of_loss(self) -> float:
+        return float(self.probability_of_loss[-1])
+
+    def value_histogram(self, day: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Values on `day` (the last day by default) at the middle of every
+        non-empty histogram bin, and the number of paths in each bin."""
+        row = (self.days if day is None else day) - 1
+        counts = self.histogram[row]
+        log_growth = self.bin_start[row] + self.bin_width[row] * (
+            np.arange(len(counts)) + 0.5
+        )
+
+        non_empty = counts > 0
+        return self.start_value * np.exp(log_growth[non_empty]), counts[non_empty]
+
+    def at_horizon(self, days: int) -> "SimulationResult":
+        """The same simulation truncated after `days` days."""
+        if not 0 < days <= self.days:
+            raise ValueError(f"Horizon must be between 1 and {self.days} days.")
+
+        return SimulationResult(
+            days=days,
+            num_simulations=self.num_simulations,
+            start_value=self.start_value,
+            bands_df=self.bands_df.loc[:days],
+            mean=self.mean[: days + 1],
+            std=self.std[: days + 1],
+            probability_of_loss=self.probability_of_loss[: days + 1],
+            sample_paths=self.sample_paths[:, : days + 1],
+            histogram=self.histogram[:days],
+            bin_start=self.bin_start[:days],
+            bin_width=self.bin_width[:days],
+            kept_values={
+                day: values for day, values in self.kept_values.items() if day <= days
+            },
+        )
+
+
+class PathAccumulator:
+    """Streaming statistics over simulated portfolio paths.
+
+    Paths are fed in chunks of cumulative log growth (one row per path, one
+    column per day). Only per-day histograms, moments and loss counts are kept,
+    plus a few display paths, so memory does not depend on the number of
+    simulations unless the values of some days are kept with `keep_values_at`.
+    Percentiles and value distributions are read from the histograms, which
+    are laid out around the expected log growth given by `log_mean` and
+    `log_std` (per day).
+    """
+
+    def __init__(
+        self,
+        days: int,
+        start_value: float,
+        log_mean: float,
+        log_std: float,
+        percentiles=DEFAULT_PERCENTILES,
+        num_sample_paths: int = 20,
+        keep_values_at=(),
+        num_bins: int = HISTOGRAM_BINS,
+    ):
+        self.days = days
+        self.start_value = start_value
+        self.percentiles = tuple(percentiles)
+        self.num_sample_paths = num_sample_paths
+        self.keep_values_at = tuple(sorted(set(keep_values_at)))
+        self.num_bins = num_bins
+
+        steps = np.arange(1, days + 1)
+        half_width = HISTOGRAM_WIDTH_STDS * max(log_std, 1e-6) * np.sqrt(steps)
+        self.bin_start = log_mean * steps - half_width
+        self.bin_width = 2 * half_width / num_bins
+        self._bin_offsets = np.arange(days) * num_bins
+
+        self.histogram = np.zeros((days, num_bins), dtype=np.int64)
+        self.count = 0
+        self.value_mean = np.zeros(days)
+        self.value_m2 = np.zeros(days)
+        self.loss_count = np.zeros(days, dtype=np.int64)
+        self.sample_paths = np.empty((0, days))
+        self.kept_chunks = {day: [] for day in self.keep_values_at}
+
+    def update(self, log_growth: np.ndarray) -> None:
+        n = len(log_growth)
+        if n == 0:
+            return
+
+        bins = ((log_growth - self.bin_start) / self.bin_width).astype(np.intp)
+        np.clip(bins, 0, self.num_bins - 1, out=bins)
+        bins += self._bin_offsets
+        self.histogram += np.bincount(
+            bins.ravel(), minlength=self.histogram.size
+        ).reshape(self.histogram.shape)
+
+        values = self.start_value * np.exp(log_growth)
+        self._merge_moments(n, values.mean(axis=0), values.var(axis=0) * n)
+        self.loss_count += (log_growth < 0).sum(axis=0)
+
+        missing_paths = self.num_sample_paths - len(self.sample_paths)
+        if missing_paths > 0:
+            self.sample_paths = np.vstack([self.sample_paths, values[:missing_paths]])
+        for day, chunks in self.kept_chunks.items():
+            chunks.append(values[:, day - 1].copy())
+
+    def merge(self, other: "PathAccumulator") -> None:
+        """Adds the statistics gathered by an accumulator with the same layout."""
+        self.histogram += other.histogram
+        self._merge_moments(other.count, other.value_mean, other.value_m2)
+        self.loss_count += other.loss_count
+
+        missing_paths = self.num_sample_paths - len(self.sample_paths)
+        if missing_paths > 0:
+            self.sample_paths = np.vstack(
+                [self.sample_paths, other.sample_paths[:missing_paths]]
+            )
+        for day, chunks in self.kept_chunks.items():
+            chunks.extend(other.kept_chunks[day])
+
+    def _merge_moments(self, n: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        # Chan et al. parallel update of mean and sum of squared deviations
+        if n == 0:
+            return
+        total = self.count + n
+        delta = mean - self.value_mean
+        self.value_mean = self.value_mean + delta * n / total
+        self.value_m2 = self.value_m2 + m2 + delta**2 * self.count * n / total
+        self.count = total
+
+    def _percentile_log_growth(self, percentile: float) -> np.ndarray:
+        cumulative = self.histogram.cumsum(axis=1)
+        target = percentile / 100 * self.count
+
+        bins = (cumulative < target).sum(axis=1).clip(max=self.num_bins - 1)
+        rows = np.arange(self.days)
+        below = np.where(bins > 0, cumulative[rows, bins - 1], 0)
+        in_bin = self.histogram[rows, bins]
+        fraction = np.divide(
+            target - below, in_bin, out=np.full(self.days, 0.5), where=in_bin > 0
+        )
+
+        return self.bin_start + (bins + fraction) * self.bin_width
+
+    def result(self) -> SimulationResult:
+        bands_df = pd.DataFrame(
+            {
+                f"p{percentile}": np.concatenate(
+                    [
+                        [self.start_value],
+                        self.start_value
+                        * np.exp(self._percentile_log_growth(percentile)),
+                    ]
+                )
+                for percentile in self.percentiles
+            }
+        )
+        bands_df.index.name = "day"
+
+        start = np.full((len(self.sample_paths), 1), self.start_value)
+        variance = self.value_m2 / max(self.count - 1, 1)
+
+        return SimulationResult(
+            days=self.days,
+            num_simulations=self.count,
+            start_value=self.start_value,
+            bands_df=bands_df,
+            mean=np.concatenate([[self.start_value], self.value_mean]),
+            std=np.concatenate([[0.0], np.sqrt(variance)]),
+            probability_of_loss=np.concatenate(
+                [[0.0], self.loss_count / max(self.count, 1)]
+            ),
+            sample_paths=np.hstack([start, self.sample_paths]),
+            histogram=self.histogram,
+            bin_start=self.bin_start,
+            bin_width=self.bin_width,
+            kept_values={
+                day: np.concatenate(chunks)
+                for day, chunks in self.kept_chunks.items()
+                if chunks
+            },
+        )
+
+
+@dataclass(frozen=True)
+class ReturnModel:
+    """Multivariate normal model of the assets' daily simple returns."""
+
+    tickers: list[str]
+    mean: np.ndarray
+    cov: np.ndarray
+    # `factor @ factor.T == cov`, the Cholesky factor when cov is definite
+    factor: np.ndarray
+
+    def portfolio_moments(self, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Mean and standard deviation of the daily return of each row of
+        `weights` (n_portfolios, n_assets)."""
+        weights = np.atleast_2d(weights)
+        variance = np.einsum("pi,ij,pj->p", weights, self.cov, weights)
+        return weights @ self.mean, np.sqrt(np.maximum(variance, 0))
+
+
+def covariance_factor(cov: np.ndarray) -> np.ndarray:
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # Singular covariance (e.g. the same asset listed twice), fall back to
+        # the eigendecomposition, which only needs it to be semi-definite
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+
+def compute_asset_returns(price_panel: PricePanel) -> np.ndarray:
+    """Daily simple returns (n_sessions - 1, n_assets) over the range where
+    every asset of the panel has a price."""
+    prices = price_panel.values[price_panel.common_range].astype(np.float64, copy=False)
+    return prices[1:] / prices[:-1] - 1
+
+
+def estimate_return_model(price_panel: PricePanel) -> ReturnModel:
+    returns = compute_asset_returns(price_panel)
+
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    return ReturnModel(
+        tickers=list(price_panel.tickers),
+        mean=returns.mean(axis=0),
+        cov=cov,
+        factor=covariance_factor(cov),
+    )
+
+
+def chunk_sizes(
+    num_simulations: int, values_per_path: int, chunk_size: int | None = None
+):
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_ELEMENTS // max(values_per_path, 1))
+
+    for chunk_start in range(0, num_simulations, chunk_size):
+        yield min(chunk_size, num_simulations - chunk_start)
+
+
+def _simulation_worker(
+    accumulator_factories, feed, num_simulations: int, seed_sequence
+) -> list[PathAccumulator]:
+    accumulators = [factory() for factory in accumulator_factories]
+    feed(
+        accumulators,
+        num_simulations=num_simulations,
+        rng=np.random.default_rng(seed_sequence),
+    )
+    return accumulators
+
+
+# Workers are started from a clean server process rather than forked from the
+# multithreaded Streamlit server, which could copy locks held by its threads
+_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+_main_module_lock = threading.Lock()
+
+_process_pool = None
+_process_pool_workers = 0
+# Runs in flight per pool, a replaced pool is shut down after its last one
+_process_pool_runs: dict[ProcessPoolExecutor, int] = {}
+_process_pool_lock = threading.Lock()
+
+
+def _wait_for_workers(barrier) -> None:
+    # Holds every worker until all have started, so that no warm-up task is
+    # done before the next one is submitted and each starts its own worker
+    barrier.wait(timeout=60)
+
+
+def _new_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool of `workers` processes, all started before it is returned."""
+    context = multiprocessing.get_context(_START_METHOD)
+    if _START_METHOD == "forkserver":
+        # Imported once by the server, workers fork from it ready to run
+        context.set_forkserver_preload([__name__])
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_wait_for_workers,
+        initargs=(context.Barrier(workers),),
+    )
+    # Submitting starts a worker while the pool lacks an idle one, starting
+    # them all now confines hiding `__main__` to the start of the pool
+    with _without_main_module():
+        for _ in range(workers):
+            pool.submit(int)
+    return pool
+
+
+@contextlib.contextmanager
+def _without_main_module():
+    """Hides the `__main__` module from the processes started meanwhile.
+
+    The forkserver and spawned workers re-run the `__main__` module of the
+    parent as they start, which under Streamlit is the page script being
+    executed (the script runner installs it as `__main__`). A stand-in without
+    a file leaves them nothing to re-run, the simulation functions are all
+    importable.
+    """
+    with _main_module_lock:
+        main_module = sys.modules["__main__"]
+        stand_in = types.ModuleType("__main__")
+        sys.modules["__main__"] = stand_in
+        try:
+            yield
+        finally:
+            # Unless a script run has installed its own meanwhile
+            if sys.modules["__main__"] is stand_in:
+                sys.modules["__main__"] = main_module
+
+
+@contextlib.contextmanager
+def _process_pool_for(workers: int):
+    """Shared pool of at least `workers` processes, kept alive while in use
+    even if a run needing more workers replaces it meanwhile."""
+    global _process_pool, _process_pool_workers
+
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers < workers:
+            replaced = _process_pool
+            _process_pool = _new_process_pool(workers)
+            _process_pool_workers = workers
+            _process_pool_runs[_process_pool] = 0
+            if replaced is not None and _process_pool_runs[replaced] == 0:
+                del _process_pool_runs[replaced]
+                replaced.shutdown(wait=False)
+        pool = _process_pool
+        _process_pool_runs[pool] += 1
+
+    try:
+        yield pool
+    finally:
+        with _process_pool_lock:
+            _process_pool_runs[pool] -= 1
+            if pool is not _process_pool and _process_pool_runs[pool] == 0:
+                del _process_pool_runs[pool]
+                pool.shutdown(wait=False)
+
+
+def _drop_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Makes the next run start a new pool instead of the broken `pool`, which
+    is shut down after its last run like a replaced one."""
+    global _process_pool, _process_pool_workers
+
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+            _process_pool_workers = 0
+
+
+def _simulate_in_processes(
+    accumulator_factories, feed, worker_simulations: list[int], seed_sequences
+) -> list[list[PathAccumulator]]:
+    """Runs the workers on the shared pool, and once more on a new pool when a
+    worker process died (killed for lack of memory, say), which breaks the
+    pool for every run after it."""
+    workers = len(seed_sequences)
+    for attempt in range(2):
+        with _process_pool_for(workers) as pool:
+            try:
+                results = pool.map(
+                    _simulation_worker,
+                    [accumulator_factories] * workers,
+                    [feed] * workers,
+                    worker_simulations,
+                    seed_sequences,
+                )
+                return list(results)
+            except BrokenProcessPool:
+                _drop_process_pool(pool)
+                if attempt > 0:
+                    raise
+
+
+def run_simulation(
+    accumulator_factories: list,
+    feed,
+    num_simulations: int,
+    seed: int | None = None,
+    workers: int = 1,
+) -> list[PathAccumulator]:
+    """Runs a simulation split over `workers` processes.
+
+    Each worker builds its accumulators with `accumulator_factories`, feeds
+    its share of the paths with `feed(accumulators, num_simulations=, rng=)`
+    using its own stream spawned from `seed`, and the workers' accumulators
+    are merged in worker order. The same seed and worker count always give
+    identical results.
+    """
+    workers = max(1, min(workers, num_simulations))
+    seed_sequences = np.random.SeedSequence(seed).spawn(workers)
+    worker_simulations = [
+        num_simulations // workers + (worker < num_simulations % workers)
+        for worker in range(workers)
+    ]
+
+    if workers == 1:
+        results = [
+            _simulation_worker(
+                accumulator_factories, feed, num_simulations, seed_sequences[0]
+            )
+        ]
+    else:
+        results = _simulate_in_processes(
+            accumulator_factories, feed, worker_simulations, seed_sequences
+        )
+
+    accumulators = results[0]
+    for worker_accumulators in results[1:]:
+        for accumulator, worker_accumulator in zip(accumulators, worker_accumulators):
+            accumulator.merge(worker_accumulator)
+
+    return accumulators
+
+
+def simulate_normal_returns(
+    accumulators: list[PathAccumulator],
+    mean: float,
+    std: float,
+    num_simulations: int,
+    rng: np.random.Generator,
+    chunk_size: int | None = None,
+) -> list[PathAccumulator]:
+    """Feeds paths of normally distributed daily returns into `accumulators`."""
+    days = accumulators[0].days
+
+    for n in chunk_sizes(num_simulations, days, chunk_size):
+        returns = rng.normal(mean, std, size=(n, days))
+        log_growth = np.log1p(returns).cumsum(axis=1)
+        for accumulator in accumulators:
+            accumulator.update(log_growth)
+
+    return accumulators
+
+
+def simulate_portfolio(
+    mean: float,
+    std: float,
+    days: int,
+    num_simulations: int = 10_000,
+    start_value: float = 10_000,
+    percentiles=DEFAULT_PERCENTILES,
+    num_sample_paths: int = 20,
+    keep_values_at=(),
+    seed: int | None = None,
+    workers: int = 1,
+) -> SimulationResult:
+    """Monte Carlo forecast of a portfolio whose daily returns are normally
+    distributed with the given mean and standard deviation."""
+    accumulator_factory = partial(
+        PathAccumulator,
+        days,
+        start_value,
+        log_mean=mean - std**2 / 2,
+        log_std=std,
+        percentiles=percentiles,
+        num_sample_paths=num_sample_paths,
+        keep_values_at=keep_values_at,
+    )
+    feed = partial(simulate_normal_returns, mean=mean, std=std)
+
+    [accumulator] = run_simulation(
+        [accumulator_factory], feed, num_simulations, seed=seed, workers=workers
+    )
+    return accumulator.result()
+
+
+def simulate_correlated_returns(
+    accumulators: list[PathAccumulator],
+    model: ReturnModel,
+    weights: np.ndarray,
+    num_simulations: int,
+    rng: np.random.Generator,
+    chunk_size: int | None = None,
+) -> list[PathAccumulator]:
+    """Feeds one accumulator per row of `weights` from a shared set of
+    correlated asset return draws.
+
+    Portfolios hold constant weights, i.e. they are rebalanced daily, so their
+    return is the weighted sum of the asset returns of the same draw.
+    """
+    days = accumulators[0].days
+    num_assets = len(model.mean)
+    values_per_path = days * max(num_assets, len(weights))
+
+    for n in chunk_sizes(num_simulations, values_per_path, chunk_size):
+        shocks = rng.standard_normal((n * days, num_assets))
+        asset_returns = shocks @ model.factor.T
+        asset_returns += model.mean
+        # (n * days, n_portfolios) -> (n_portfolios, n, days)
+        portfolio_returns = (asset_returns @ weights.T).T.reshape(-1, n, days)
+
+        for accumulator, returns in zip(accumulators, portfolio_returns):
+            accumulator.update(np.log1p(returns).cumsum(axis=1))
+
+    return accumulators
+
+
+def simulate_allocations(
+    model: ReturnModel,
+    weights: np.ndarray,
+    days: int,
+    num_simulations: int = 10_000,
+    start_value: float = 10_000,
+    percentiles=DEFAULT_PERCENTILES,
+    num_sample_paths: int = 20,
+    keep_values_at=(),
+    seed: int | None = None,
+    workers: int = 1,
+) -> list[SimulationResult]:
+    """Monte Carlo forecast of several allocations of the assets of `model`.
+
+    `weights` is (n_portfolios, n_assets) with rows summing to 1. All
+    portfolios are evaluated on the same simulated asset returns, so each one
+    only costs an extra matrix product.
+    """
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    means, stds = model.portfolio_moments(weights)
+
+    accumulator_factories = [
+        partial(
+            PathAccumulator,
+            days,
+            start_value,
+            log_mean=mean - std**2 / 2,
+            log_std=std,
+            percentiles=percentiles,
+            num_sample_paths=num_sample_paths,
+            keep_values_at=keep_values_at,
+        )
+        for mean, std in zip(means, stds)
+    ]
+    feed = partial(simulate_correlated_returns, model=model, weights=weights)
+
+    accumulators = run_simulation(
+        accumulator_factories, feed, num_simulations, seed=seed, workers=workers
+    )
+    return [accumulator.result() for accumulator in accumulators]
+
+
+BOOTSTRAP_METHODS = ("iid", "stationary", "circular")
+
+
+def bootstrap_indices(
+    rng: np.random.Generator,
+    num_paths: int,
+    days: int,
+    num_observations: int,
+    method: str = "stationary",
+    block_length: int = 20,
+) -> np.ndarray:
+    """Indices (num_paths, days) of the historical observations to replay.
+
+    "iid" draws every day independently. "stationary" (Politis-Romano) starts
+    a new block with probability 1 / `block_length` on each day, "circular"
+    uses blocks of exactly `block_length` days. Blocks wrap around the end of
+    the history.
+    """
+    starts = rng.integers(0, num_observations, size=(num_paths, days))
+    if method == "iid":
+        return starts
+
+    if method == "stationary":
+        new_block = rng.random((num_paths, days)) < 1 / block_length
+    elif method == "circular":
+        new_block = np.broadcast_to(np.arange(days) % block_length == 0, starts.shape)
+    else:
+        raise ValueError(
+            f"Unknown bootstrap method '{method}', "
+            f"expected one of: {', '.join(BOOTSTRAP_METHODS)}"
+        )
+
+    days_range = np.arange(days)
+    # Day on which the block containing each day started
+    block_start = np.maximum.accumulate(np.where(new_block, days_range, 0), axis=1)
+
+    indices = np.take_along_axis(starts, block_start, axis=1) + days_range - block_start
+    return indices % num_observations
+
+
+def simulate_bootstrap_returns(
+    accumulators: list[PathAccumulator],
+    log_returns: np.ndarray,
+    num_simulations: int,
+    rng: np.random.Generator,
+    method: str = "stationary",
+    block_length: int = 20,
+    chunk_size: int | None = None,
+) -> list[PathAccumulator]:
+    """Feeds one accumulator per column of `log_returns` (n_observations,
+    n_portfolios) with paths replaying resampled historical days. All
+    portfolios replay the same days."""
+    days = accumulators[0].days
+
+    for n in chunk_sizes(num_simulations, days * len(accumulators), chunk_size):
+        indices = bootstrap_indices(
+            rng, n, days, len(log_returns), method=method, block_length=block_length
+        )
+        for accumulator, portfolio_log_returns in zip(accumulators, log_returns.T):
+            accumulator.update(portfolio_log_returns[indices].cumsum(axis=1))
+
+    return accumulators
+
+
+def simulate_bootstrap(
+    asset_returns: np.ndarray,
+    weights: np.ndarray,
+    days: int,
+    num_simulations: int = 10_000,
+    start_value: float = 10_000,
+    method: str = "stationary",
+    block_length: int = 20,
+    percentiles=DEFAULT_PERCENTILES,
+    num_sample_paths: int = 20,
+    keep_values_at=(),
+    seed: int | None = None,
+    workers: int = 1,
+) -> list[SimulationResult]:
+    """Monte Carlo forecast of several allocations by resampling whole days
+    (rows) of the historical `asset_returns` (n_observations, n_assets).
+
+    Like `simulate_allocations`, portfolios hold constant weights, so each
+    day's portfolio return is computed once from the history and only the
+    sampled indices differ between paths.
+    """
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    log_returns = np.log1p(asset_returns @ weights.T)
+
+    accumulator_factories = [
+        partial(
+            PathAccumulator,
+            days,
+            start_value,
+            log_mean=log_mean,
+            log_std=log_std,
+            percentiles=percentiles,
+            num_sample_paths=num_sample_paths,
+            keep_values_at=keep_values_at,
+        )
+        for log_mean, log_std in zip(log_returns.mean(axis=0), log_returns.std(axis=0))
+    ]
+    feed = partial(
+        simulate_bootstrap_returns,
+        log_returns=log_returns,
+        method=method,
+        block_length=block_length,
+    )
+
+    accumulators = run_simulation(
+        accumulator_factories, feed, num_simulations, seed=seed, workers=workers
+    )
+    return [accumulator.result() for accumulator in accumulators]
@@ -1,6 +1,12 @@
+import threading
+
 import pandas as pd
 import streamlit as st
 
+from portfolio_analyzer import profiling
+from portfolio_analyzer.cache import RESULT_CACHE, CacheStats
+from portfolio_analyzer.config import PROFILING
+
 
 def rename_ticker_columns_to_names(
     df: pd.DataFrame, ticker_df: pd.DataFrame, name_col: str = "name"
@@ -24,6 +30,70 @@ def store_value(key):
     st.session_state[key] = st.session_state[f"_{key}"]
 
 
+def plotly_chart(fig, **kwargs):
+    """`st.plotly_chart`, timed with the serialization of the figure."""
+    with profiling.span("plotly_chart", "render", title=fig.layout.title.text):
+        return st.plotly_chart(fig, **kwargs)
+
+
+def start_profiling() -> tuple[int, CacheStats] | None:
+    """Marks the start of a rerun for `show_profiling_panel`, with the result
+    cache counters to report the rerun's lookups from."""
+    if not PROFILING:
+        return None
+    return profiling.clock(), RESULT_CACHE.stats()
+
+
+def show_profiling_panel(start: tuple[int, CacheStats] | None) -> None:
+    """Sidebar panel with the time spent in every stage since `start`, the
+    result cache hit rate and a Chrome trace of the rerun."""
+    if start is None:
+        return
+    started, started_stats = start
+
+    spans = profiling.spans_since(started, threading.get_ident())
+    stages_df = (
+        pd.DataFrame(
+            {
+                "stage": [span.name for span in spans],
+                "category": [span.category for span in spans],
+                "ms": [span.duration / 1e6 for span in spans],
+            }
+        )
+        .groupby(["stage", "category"], as_index=False)["ms"]
+        .agg(calls="count", total="sum", max="max")
+        .sort_values("total", ascending=False)
+    )
+    stats = RESULT_CACHE.stats()
+    lookups = stats.hits + stats.misses
+    # The counters are shared, lookups of sessions rerunning meanwhile count too
+    rerun_hits = stats.hits - started_stats.hits
+    rerun_lookups = lookups - started_stats.hits - started_stats.misses
+
+    with st.sidebar.expander("Profiling", expanded=True):
+        rerun_col, cache_col = st.columns(2)
+        rerun_col.metric("Rerun", f"{(profiling.clock() - started) / 1e6:.0f} ms")
+        cache_col.metric(
+            "Cache hit rate",
+            f"{rerun_hits / rerun_lookups:.0%}" if rerun_lookups else "-",
+        )
+        st.dataframe(stages_df, hide_index=True)
+        st.caption("Stage times in ms include the stages they call.")
+        st.caption(
+            f"Result cache this rerun: {rerun_hits} hits out of {rerun_lookups} "
+            f"lookups, {stats.coalesced - started_stats.coalesced} coalesced. "
+            f"Since startup: {stats.hits / max(lookups, 1):.0%} hit rate over "
+            f"{lookups} lookups, {stats.entries} entries, "
+            f"{stats.size / 2**20:.0f} of {stats.max_size / 2**20:.0f} MB."
+        )
+        st.download_button(
+            "Chrome trace",
+            data=profiling.chrome_trace(profiling.spans_since(started)),
+            file_name="trace.json",
+            mime="application/json",
+        )
+
+
 def format_number_with_thousands_separator(n: float | int) -> str:
     return f"{n:_.0f}".replace("_", ".")
 